@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
+import tempfile
 from pathlib import Path
 # from dotenv import load_dotenv
 
@@ -50,6 +52,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "main.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -141,6 +144,9 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "main/static"),
 ]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Tests run without collectstatic, so there is no manifest to look names up in
+if sys.argv[1:2] == ["test"]:
+    STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -161,6 +167,19 @@ if not DEBUG:
         "style-src": ("'self'", "'unsafe-inline'"),
     }
 
+# Usage analytics: counts are aggregated in memory and flushed in bulk
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "True") == "True"
+ANALYTICS_FLUSH_SECONDS = int(os.getenv("ANALYTICS_FLUSH_SECONDS", "60"))
+
+# On-demand request profiling (X-Profile header): where captures go and how many are kept
+# Kept outside BASE_DIR, which docker-compose bind-mounts from the host checkout
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "gradepredict-profiles"))
+PROFILING_MAX_CAPTURES = int(os.getenv("PROFILING_MAX_CAPTURES", "50"))
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE", "3600"))
+
+# Precomputed answers from build_answer_table, memory-mapped by every worker (empty disables)
+ANSWER_TABLE_PATH = os.getenv("ANSWER_TABLE_PATH", "")
+
 # Logging configuration
 LOGGING = {
     "version": 1,
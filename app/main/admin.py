@@ -1,3 +1,74 @@
+import os
+
 from django.contrib import admin
+from django.db.models import Sum
+from django.utils.html import format_html
+
+from .models import Gradebook, ProfileCapture, UsageBucket
+from .profiling import profile_directory, top_functions
+
+
+@admin.register(Gradebook)
+class GradebookAdmin(admin.ModelAdmin):
+    list_display = ("student_key", "course", "assign_count", "test_count", "final_grade", "updated_at")
+    search_fields = ("student_key", "course")
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(UsageBucket)
+class UsageBucketAdmin(admin.ModelAdmin):
+    """Read-only usage counts with a per-metric summary of the filtered rows."""
+    list_display = ("bucket_start", "metric", "key", "count")
+    list_filter = ("metric", "bucket_start")
+    date_hierarchy = "bucket_start"
+    change_list_template = "admin/main/usagebucket/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        changelist = getattr(response, "context_data", {}).get("cl")
+        if changelist is None:
+            return response
+
+        totals = (
+            changelist.queryset.order_by()
+            .values("metric", "key")
+            .annotate(total=Sum("count"))
+            .order_by("metric", "-total", "key")
+        )
+        summary = {}
+        for row in totals:
+            summary.setdefault(row["metric"], []).append(row)
+        for rows in summary.values():
+            metric_total = sum(row["total"] for row in rows) or 1
+            for row in rows:
+                row["share"] = round(row["total"] * 100 / metric_total, 1)
+        response.context_data["usage_summary"] = sorted(summary.items())
+        return response
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    """Recent profiled requests; the detail page shows the hottest functions."""
+    list_display = ("created_at", "method", "path", "status_code", "duration_ms", "total_calls")
+    list_filter = ("method", "status_code")
+    search_fields = ("path",)
+    readonly_fields = ("created_at", "method", "path", "status_code", "duration_ms", "total_calls", "filename", "stats")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
-# Register your models here.
+    @admin.display(description="Top functions by cumulative time")
+    def stats(self, obj):
+        path = os.path.join(profile_directory(), obj.filename)
+        if not os.path.exists(path):
+            return "Profile file is missing"
+        return format_html("<pre>{}</pre>", top_functions(path))
@@ -0,0 +1,160 @@
+"""
+Anonymous usage analytics aggregated in memory.
+
+Each worker process counts calculator usage (branch taken, language,
+weight scheme, grade and needed-score histograms) in a dict guarded by a
+lock. Every ANALYTICS_FLUSH_SECONDS the counts are written with one upsert
+per (bucket, metric, key), adding to the stored totals, so per-request cost
+is a few dict increments and the database sees a handful of writes per
+interval regardless of traffic. The request that crosses the interval only
+hands the flush to a background thread, so no request waits on the writes.
+No grades or identifiers are kept, only bucketed counts. Counts not yet
+flushed when a worker exits are lost.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+from .models import UsageBucket
+
+logger = logging.getLogger(__name__)
+
+# Length of one stored time bucket
+BUCKET_SECONDS = 3600
+
+
+def _percent_bin(percent):
+    """10-point histogram bin label for a 0-100 percentage."""
+    low = min(int(percent // 10) * 10, 90)
+    return f"{low}-{low + 10}"
+
+
+def _needed_bin(needed_score, reachable):
+    """1-point histogram bin label for a needed score on the 0-10 scale."""
+    if not reachable:
+        return "unreachable"
+    low = min(int(needed_score), 9)
+    return f"{low}-{low + 1}"
+
+
+class UsageAggregator:
+    """Thread-safe in-memory counters with periodic bulk flushing."""
+
+    def __init__(self, flush_seconds=None, clock=time.time, background=True):
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        self.background = background
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._last_flush = clock()
+        self._flusher = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, "ANALYTICS_ENABLED", True)
+
+    def _interval(self):
+        if self.flush_seconds is not None:
+            return self.flush_seconds
+        return getattr(settings, "ANALYTICS_FLUSH_SECONDS", 60)
+
+    def _add(self, items):
+        now = self.clock()
+        bucket = int(now // BUCKET_SECONDS) * BUCKET_SECONDS
+        flusher = None
+        with self._lock:
+            for metric, key in items:
+                self._counts[(bucket, metric, key)] += 1
+            due = now - self._last_flush >= self._interval()
+            if due:
+                self._last_flush = now
+                if self.background and self._flusher is not None and self._flusher.is_alive():
+                    # The previous flush is still writing; these counts go out next interval
+                    due = False
+                elif self.background:
+                    flusher = self._flusher = threading.Thread(
+                        target=self._background_flush, name="usage-analytics-flush", daemon=True
+                    )
+        if flusher is not None:
+            flusher.start()
+        elif due:
+            self.flush()
+
+    def _background_flush(self):
+        try:
+            self.flush()
+        finally:
+            # Each thread gets its own database connection; don't leak this one
+            connection.close()
+
+    def record_prediction(self, response_data, weights, language, answer_table=None):
+        """Count one successful calculation; answer_table is "hit" or "miss" when a table is loaded."""
+        if not self.enabled:
+            return
+        predictions = response_data.get("predictions")
+        if not predictions:
+            branch = "highest"
+        elif "needed_tens" in predictions[0]:
+            branch = "assignments"
+        elif "needed_final_score" in predictions[0]:
+            branch = "final_only"
+        else:
+            branch = "remaining"
+        items = [
+            ("branch", branch),
+            ("language", language),
+            ("current_grade", str(response_data["current_grade"])),
+            ("percent", _percent_bin(response_data["current_percent"])),
+            ("weights", "/".join(str(round(w * 100)) for w in weights)),
+        ]
+        if predictions and "needed_score" in predictions[0]:
+            items.append(("needed_score", _needed_bin(predictions[0]["needed_score"], predictions[0]["reachable"])))
+        if answer_table:
+            items.append(("answer_table", answer_table))
+        self._add(items)
+
+    def record_error(self, key, language):
+        """Count one rejected calculation by its error translation key."""
+        if self.enabled:
+            self._add([("branch", "error"), ("error", key), ("language", language)])
+
+    def flush(self):
+        """Upsert the accumulated counts, adding them to the stored totals."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+
+        quote = connection.ops.quote_name
+        table = quote(UsageBucket._meta.db_table)
+        count_column = quote("count")
+        sql = (
+            f"INSERT INTO {table} ({quote('bucket_start')}, {quote('metric')}, {quote('key')}, {count_column}) "
+            f"VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT ({quote('bucket_start')}, {quote('metric')}, {quote('key')}) "
+            f"DO UPDATE SET {count_column} = {table}.{count_column} + EXCLUDED.{count_column}"
+        )
+        rows = []
+        for (bucket, metric, key), count in counts.items():
+            bucket_start = datetime.fromtimestamp(bucket, tz=dt_timezone.utc)
+            if not settings.USE_TZ:
+                bucket_start = bucket_start.replace(tzinfo=None)
+            rows.append((connection.ops.adapt_datetimefield_value(bucket_start), metric, key, count))
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+        except Exception as e:
+            # Keep the counts for the next interval rather than dropping them
+            logger.warning(f"Usage analytics flush failed: {str(e)}")
+            with self._lock:
+                self._counts.update(counts)
+
+
+usage = UsageAggregator()
+
@@ -0,0 +1,289 @@
+"""
+Precomputed calculator answers shared by all workers through mmap.
+
+With the default weights, a prediction for missing tests or a missing
+final depends only on the assignment average, the test average, the final
+grade and the number of missing tests. On a half-point grid that space
+is small, so build_answer_table computes every state once with
+predict_from_aggregates() and writes fixed-size records to a binary file.
+Each worker maps the file read-only, so the pages are shared through the
+OS page cache and a lookup is one struct unpack at a computed offset.
+
+Inputs off the grid, with custom weights, with more than the tabulated
+number of missing tests, or with every part completed (that branch depends
+on grade counts, not averages) fall back to the live engine.
+
+The header carries a fingerprint of the grade thresholds, default weights
+and table layout; a file built for different values is ignored. Bump
+FORMAT_VERSION whenever predict_from_aggregates() changes its output.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+from .grading import (
+    DEFAULT_WEIGHT_ASSIGNMENTS,
+    DEFAULT_WEIGHT_TESTS,
+    DEFAULT_WEIGHT_FINAL,
+    GRADES_PERCENT,
+    LETTER_GRADES,
+    assignment_average,
+    predict_from_aggregates,
+    summarize_assignments,
+)
+from .translations import get_translation
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GPAT"
+FORMAT_VERSION = 1
+
+# Grid points per grade point: averages must be whole or half points
+RESOLUTION = 2
+DEFAULT_MAX_MISSING_TESTS = 5
+
+DEFAULT_WEIGHTS = (DEFAULT_WEIGHT_ASSIGNMENTS, DEFAULT_WEIGHT_TESTS, DEFAULT_WEIGHT_FINAL)
+
+# magic, format version, resolution, max missing tests, fingerprint, record count
+_HEADER = struct.Struct("<4sHHH16sI")
+# current grade (0 = not tabulated), flags, current percent * 100,
+# then needed score * 100 and needed percent * 100 for up to three targets
+_RECORD = struct.Struct("<BBH6I")
+_MAX_TARGETS = 3
+
+_FLAG_FINAL_ONLY = 1
+_FLAG_REACHABLE = 2   # shifted by target index
+_FLAG_CLIPPED = 16    # shifted by target index
+
+# One slot for "not taken" plus every grid point from 0 to 10
+_AXIS = 10 * RESOLUTION + 2
+
+
+def fingerprint(max_missing_tests):
+    """Identifies the thresholds, weights and layout a table was built for."""
+    source = json.dumps({
+        "format": FORMAT_VERSION,
+        "resolution": RESOLUTION,
+        "max_missing_tests": max_missing_tests,
+        "grades_percent": sorted(GRADES_PERCENT.items()),
+        "weights": DEFAULT_WEIGHTS,
+    })
+    return hashlib.sha256(source.encode()).digest()[:16]
+
+
+def _axis_value(index):
+    return None if index == 0 else (index - 1) / RESOLUTION
+
+
+# Grid slot of every on-grid value; a dict lookup is the whole hot-path check
+_AXIS_SLOTS = {None: 0, **{_axis_value(index): index for index in range(1, _AXIS)}}
+
+
+def _centi(value):
+    return int(round(value * 100))
+
+
+def _record_offset(assign_index, test_index, final_index, missing_tests, max_missing_tests):
+    position = ((assign_index * _AXIS + test_index) * _AXIS + final_index) * (max_missing_tests + 1) + missing_tests
+    return _HEADER.size + position * _RECORD.size
+
+
+def _encode(response_data):
+    """Pack a predict_from_aggregates() response into a record."""
+    predictions = response_data.get("predictions", [])
+    if predictions and "needed_tens" in predictions[0]:
+        # All parts complete: depends on grade counts, not tabulated
+        return _RECORD.pack(0, 0, 0, 0, 0, 0, 0, 0, 0)
+    flags = 0
+    needed = []
+    for index, pred in enumerate(predictions):
+        if "needed_final_score" in pred:
+            flags |= _FLAG_FINAL_ONLY
+        if pred["reachable"]:
+            flags |= _FLAG_REACHABLE << index
+        if isinstance(pred["needed_score"], int):
+            # Negative needs are clipped to integer zero
+            flags |= _FLAG_CLIPPED << index
+        needed.extend((_centi(pred["needed_score"]), _centi(pred["needed_percent"])))
+    needed.extend([0] * (2 * _MAX_TARGETS - len(needed)))
+    return _RECORD.pack(response_data["current_grade"], flags, _centi(response_data["current_percent"]), *needed)
+
+
+def build(path, max_missing_tests=DEFAULT_MAX_MISSING_TESTS):
+    """Compute every grid state and atomically replace the table at ``path``."""
+    records = []
+    for assign_index in range(_AXIS):
+        assign_value = _axis_value(assign_index)
+        assignments = {
+            "sum": assign_value or 0.0,
+            "count": 0 if assign_value is None else 1,
+            "weighted_sum": None,
+            "weight_total": None,
+            "first_type_weight": None,
+        }
+        for test_index in range(_AXIS):
+            test_value = _axis_value(test_index)
+            test_count = 0 if test_value is None else 1
+            for final_index in range(_AXIS):
+                final_value = _axis_value(final_index)
+                for missing_tests in range(max_missing_tests + 1):
+                    response_data = predict_from_aggregates(
+                        assignments, test_value or 0.0, test_count, final_value,
+                        test_count + missing_tests, DEFAULT_WEIGHTS, 'en',
+                    )
+                    records.append(_encode(response_data))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, RESOLUTION, max_missing_tests,
+                             fingerprint(max_missing_tests), len(records)))
+        f.write(b"".join(records))
+    os.replace(temporary_path, path)
+    return len(records)
+
+
+class AnswerTable:
+    """Read-only view of a built table, mapped on first use."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._map = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.max_missing_tests = 0
+
+    @property
+    def available(self):
+        self._load()
+        return self._map is not None
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._map, self.max_missing_tests = self._open()
+                self._loaded = True
+
+    def _open(self):
+        path = self.path or getattr(settings, "ANSWER_TABLE_PATH", None)
+        if not path or not os.path.exists(path):
+            return None, 0
+        try:
+            with open(path, "rb") as f:
+                table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, resolution, max_missing_tests, stored_fingerprint, count = _HEADER.unpack_from(table)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Cannot read answer table at {path}: {str(e)}")
+            return None, 0
+        expected_size = _HEADER.size + count * _RECORD.size
+        if (magic != MAGIC or version != FORMAT_VERSION or resolution != RESOLUTION
+                or stored_fingerprint != fingerprint(max_missing_tests) or len(table) != expected_size):
+            logger.warning(f"Ignoring stale answer table at {path}; rebuild it with build_answer_table")
+            table.close()
+            return None, 0
+        return table, max_missing_tests
+
+    def lookup(self, parsed, language='en', assignments=None):
+        """
+        The calculate_prediction response for a parse_grade_input() dict,
+        or None when the input is not covered by the table.
+
+        Pass the summarize_assignments() result as ``assignments`` to share
+        it with the live engine on a miss. The cheap checks run first, so
+        most misses return before the assignments are summarized.
+        """
+        self._load()
+        if self._map is None or parsed["weights"] != DEFAULT_WEIGHTS:
+            return None
+        test_grades = parsed["test_grades"]
+        missing_tests = max(0, parsed["total_tests"] - len(test_grades))
+        if missing_tests > self.max_missing_tests:
+            return None
+        test_index = _AXIS_SLOTS.get(sum(test_grades) / len(test_grades) if test_grades else None)
+        final_index = _AXIS_SLOTS.get(parsed["final_grade"])
+        if test_index is None or final_index is None:
+            return None
+
+        if assignments is None:
+            assignments = summarize_assignments(
+                parsed["assign_grades"], parsed["assign_types"], parsed["assignment_type_weights"]
+            )
+        assign_index = _AXIS_SLOTS.get(assignment_average(assignments))
+        if assign_index is None:
+            return None
+
+        current_grade, flags, current_centi, *needed = _RECORD.unpack_from(
+            self._map, _record_offset(assign_index, test_index, final_index, missing_tests, self.max_missing_tests)
+        )
+        if current_grade == 0:
+            return None
+        response_data = self._render(current_grade, flags, current_centi / 100, needed,
+                                     missing_tests, parsed["final_grade"] is not None, language)
+        if parsed.get("rescaled_types"):
+            response_data["rescaled_types"] = parsed["rescaled_types"]
+        return response_data
+
+    @staticmethod
+    def _render(current_grade, flags, current_percent, needed, missing_tests, has_final, language):
+        """Rebuild the predict_from_aggregates() response from a record."""
+        target_grades = sorted(g for g in GRADES_PERCENT if g > current_grade)
+        if not target_grades:
+            response_data = {
+                "message": get_translation('already_highest', language),
+                "current_grade": current_grade,
+                "current_percent": current_percent,
+            }
+            if language == 'en':
+                response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
+            return response_data
+
+        missing_parts = []
+        if missing_tests > 0:
+            missing_parts.append(f"{missing_tests} test(s)")
+        if not has_final:
+            missing_parts.append("final exam")
+
+        predictions = []
+        for index, target_grade in enumerate(target_grades):
+            if flags & (_FLAG_CLIPPED << index):
+                needed_score = needed_percent = 0
+            else:
+                needed_score = needed[2 * index] / 100
+                needed_percent = needed[2 * index + 1] / 100
+            pred = {
+                "target_grade": target_grade,
+                "needed_score": needed_score,
+                "needed_percent": needed_percent,
+                "reachable": bool(flags & (_FLAG_REACHABLE << index)),
+                "missing_parts": list(missing_parts),
+            }
+            if flags & _FLAG_FINAL_ONLY:
+                # With only the final missing, the final needs equal the totals
+                pred["needed_final_percent"] = needed_percent
+                pred["needed_final_score"] = needed_score
+            predictions.append(pred)
+
+        response_data = {
+            "message": get_translation('grade_predictions_remaining', language),
+            "current_grade": current_grade,
+            "current_percent": current_percent,
+            "predictions": predictions,
+            "language": language,
+        }
+        if language == 'en':
+            response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
+            for pred in predictions:
+                pred["target_grade_letter"] = LETTER_GRADES.get(pred["target_grade"], str(pred["target_grade"]))
+        return response_data
+
+
+answers = AnswerTable()
@@ -0,0 +1,523 @@
+"""
+Differential testing harness for the grade prediction engines.
+
+Keeps a frozen, deliberately straightforward reference implementation of
+calculate_prediction and checks alternative code paths against it on
+randomly generated inputs. Failing inputs are shrunk to a minimal example
+before being reported.
+
+Engines are callables taking a dict of calculator POST fields (all
+strings) and returning (status_code, response_dict). Register new ones in
+ENGINES so the test suite and the difftest command pick them up.
+"""
+
+import json
+import math
+import os
+import random
+import tempfile
+
+from .translations import get_translation
+
+# Frozen copies of the constants the reference was written against. Do not
+# import them from grading.py: a change there must show up as a difference.
+_REFERENCE_GRADES_PERCENT = {5: 0.85, 4: 0.65, 3: 0.40, 2: 0.00}
+_REFERENCE_LETTER_GRADES = {5: 'A', 4: 'B', 3: 'C', 2: 'F'}
+
+ASSIGNMENT_TYPE_NAMES = ['HW', 'Quiz', 'Lab', 'Essay']
+LANGUAGES = ['en', 'kk', 'ru', 'xx']
+
+
+def reference_prediction(data):
+    """
+    Reference implementation of calculate_prediction for a dict of POST fields.
+
+    This mirrors the calculator's behavior one input at a time with no shared
+    helpers, caching or vectorization. Only change it when the calculator's
+    behavior is meant to change.
+    """
+    language = data.get("language", "en")
+    if language not in ['en', 'kk', 'ru']:
+        language = 'en'
+
+    def error(key):
+        return 400, {"message": get_translation(key, language)}
+
+    weight_assignments = float(data.get("weight_assignments", 25.0)) / 100.0
+    weight_tests = float(data.get("weight_tests", 25.0)) / 100.0
+    weight_final = float(data.get("weight_final", 50.0)) / 100.0
+    weight_total = weight_assignments + weight_tests + weight_final
+    if weight_total > 0:
+        weight_assignments = weight_assignments / weight_total
+        weight_tests = weight_tests / weight_total
+        weight_final = weight_final / weight_total
+    else:
+        weight_assignments, weight_tests, weight_final = 0.25, 0.25, 0.5
+
+    assign_grades = [float(g) for g in data.get("grades", "").split(",") if g.strip()]
+    assign_types_str = data.get("assignment_types", "")
+    assign_types = [t.strip() for t in assign_types_str.split(",") if t.strip()] if assign_types_str else []
+    try:
+        type_weights = json.loads(data["assignment_type_weights"]) if data.get("assignment_type_weights") else {}
+    except json.JSONDecodeError:
+        type_weights = {}
+    try:
+        type_maxes = json.loads(data["assignment_type_maxes"]) if data.get("assignment_type_maxes") else {}
+    except json.JSONDecodeError:
+        type_maxes = {}
+
+    test_grades_raw = [float(g) for g in data.get("test_grades", "").split(",") if g.strip()]
+    test_maxes = [float(m) for m in data.get("test_maxes", "").split(",") if m.strip()]
+    final_str = data.get("final_grade", "")
+    final_raw = float(final_str) if final_str.strip() else None
+    final_max_str = data.get("final_max", "")
+    final_max = float(final_max_str) if final_max_str.strip() else None
+    total_tests_str = data.get("total_tests", "")
+    total_tests = int(total_tests_str) if total_tests_str.strip() else len(test_grades_raw)
+
+    test_grades = []
+    if test_grades_raw:
+        if len(test_grades_raw) == len(test_maxes):
+            for grade, max_val in zip(test_grades_raw, test_maxes):
+                if max_val <= 0:
+                    return error('invalid_grades')
+                if grade > max_val:
+                    return error('grade_exceeds_max')
+                test_grades.append((grade / max_val) * 10)
+        else:
+            test_grades = [min(grade, 10.0) for grade in test_grades_raw]
+
+    final_grade = None
+    if final_raw is not None:
+        if final_max is not None and final_max > 0:
+            if final_raw > final_max:
+                return error('grade_exceeds_max')
+            final_grade = (final_raw / final_max) * 10
+        else:
+            final_grade = min(final_raw, 10.0)
+
+    for grade in assign_grades + test_grades:
+        if grade < 0:
+            return error('invalid_grades')
+    if final_grade is not None and final_grade < 0:
+        return error('invalid_grades')
+
+    # Per-type assignment maximums
+    for max_val in type_maxes.values():
+        if float(max_val) <= 0:
+            return error('invalid_grades')
+    per_type = bool(type_maxes) and len(assign_types) == len(assign_grades)
+    rescaled_types = set()
+    scaled = []
+    for i, grade in enumerate(assign_grades):
+        max_val = float(type_maxes.get(assign_types[i], 10.0)) if per_type else 10.0
+        if grade > max_val:
+            return error('grade_exceeds_max' if max_val != 10.0 else 'invalid_grades')
+        if max_val != 10.0:
+            rescaled_types.add(assign_types[i])
+            grade = (grade / max_val) * 10
+        scaled.append(grade)
+    assign_grades = scaled
+
+    typed = bool(assign_types) and len(assign_types) == len(assign_grades) and bool(type_weights)
+    assign_avg = None
+    if assign_grades:
+        assign_avg = sum(assign_grades) / len(assign_grades)
+        if typed:
+            weighted_sum = 0.0
+            weight_sum = 0.0
+            for grade, assign_type in zip(assign_grades, assign_types):
+                weighted_sum += grade * (type_weights.get(assign_type, 100.0) / 100.0)
+                weight_sum += type_weights.get(assign_type, 100.0) / 100.0
+            if weight_sum > 0:
+                assign_avg = weighted_sum / weight_sum
+
+    current_score = 0.0
+    weight_used = 0.0
+    if assign_avg is not None:
+        current_score += assign_avg * weight_assignments
+        weight_used += weight_assignments
+    if test_grades:
+        current_score += (sum(test_grades) / len(test_grades)) * weight_tests
+        weight_used += weight_tests
+    if final_grade is not None:
+        current_score += final_grade * weight_final
+        weight_used += weight_final
+    current_percent = current_score / 10 if weight_used > 0 else 0.0
+
+    current_grade = 2
+    for grade in sorted(_REFERENCE_GRADES_PERCENT):
+        if current_percent >= _REFERENCE_GRADES_PERCENT[grade]:
+            current_grade = grade
+    targets = [g for g in sorted(_REFERENCE_GRADES_PERCENT) if g > current_grade]
+
+    body = {"current_grade": current_grade, "current_percent": round(current_percent * 100, 2)}
+    if language == 'en':
+        body["current_grade_letter"] = _REFERENCE_LETTER_GRADES[current_grade]
+    if rescaled_types:
+        body["rescaled_types"] = sorted(rescaled_types)
+    if not targets:
+        body["message"] = get_translation('already_highest', language)
+        return 200, body
+
+    missing_tests = max(0, total_tests - len(test_grades))
+    predictions = []
+    if missing_tests > 0 or final_grade is None:
+        missing_weight = 0.0
+        missing_parts = []
+        if missing_tests > 0:
+            missing_weight += weight_tests
+            missing_parts.append(f"{missing_tests} test(s)")
+        if final_grade is None:
+            missing_weight += weight_final
+            missing_parts.append("final exam")
+        for target in targets:
+            needed = (_REFERENCE_GRADES_PERCENT[target] * 10 - current_score) / missing_weight
+            needed_percent = (needed / 10) * 100
+            if needed < 0:
+                needed, needed_percent = 0, 0
+            pred = {
+                "target_grade": target,
+                "needed_score": round(needed, 2),
+                "needed_percent": round(needed_percent, 2),
+                "reachable": needed <= 10,
+                "missing_parts": missing_parts,
+            }
+            if final_grade is None and missing_tests == 0:
+                needed_final = (_REFERENCE_GRADES_PERCENT[target] * 10 - current_score) / weight_final if weight_final > 0 else 0
+                needed_final_percent = (needed_final / 10) * 100
+                if needed_final < 0:
+                    needed_final, needed_final_percent = 0, 0
+                pred["needed_final_percent"] = round(needed_final_percent, 2)
+                pred["needed_final_score"] = round(needed_final, 2)
+            predictions.append(pred)
+        body["message"] = get_translation('grade_predictions_remaining', language)
+    else:
+        fixed = final_grade * weight_final
+        if test_grades:
+            fixed = (sum(test_grades) / len(test_grades)) * weight_tests + fixed
+        for target in targets:
+            threshold = _REFERENCE_GRADES_PERCENT[target] * 10
+            if current_score >= threshold:
+                predictions.append({"target_grade": target, "needed_tens": 0, "reachable": True, "message": "Already reached"})
+                continue
+            n = 0
+            while n <= 20:
+                if typed:
+                    first_weight = type_weights.get(assign_types[0], 100.0) / 100.0
+                    new_sum = weighted_sum + 10 * first_weight * n
+                    new_total = weight_sum + first_weight * n
+                    new_avg = new_sum / new_total if new_total > 0 else 10
+                elif assign_grades:
+                    count = len(assign_grades) + n
+                    new_avg = (sum(assign_grades) + 10 * n) / count
+                else:
+                    new_avg = 10.0
+                if new_avg * weight_assignments + fixed >= threshold:
+                    break
+                n += 1
+            predictions.append({"target_grade": target, "needed_tens": n if n <= 20 else None, "reachable": n <= 20})
+        body["message"] = get_translation('grade_predictions_assignments', language)
+
+    if language == 'en':
+        for pred in predictions:
+            pred["target_grade_letter"] = _REFERENCE_LETTER_GRADES[pred["target_grade"]]
+    body["predictions"] = predictions
+    body["language"] = language
+    return 200, body
+
+
+# Input generation
+
+def _number(rng, low, high):
+    """Integer, half-point or arbitrary grade in [low, high]."""
+    kind = rng.random()
+    if kind < 0.4:
+        return str(rng.randint(int(low), int(high)))
+    if kind < 0.7:
+        return str(rng.randint(int(low * 2), int(high * 2)) / 2)
+    return str(round(rng.uniform(low, high), rng.choice([1, 2, 3])))
+
+
+def random_case(rng):
+    """Generate one random calculator input as a dict of POST strings."""
+    data = {}
+    types = rng.sample(ASSIGNMENT_TYPE_NAMES, rng.randint(1, len(ASSIGNMENT_TYPE_NAMES)))
+    type_maxes = {t: rng.choice([10, 10, 5, 20, 50, 100]) for t in types}
+
+    count = rng.choice([0, 1, 2, 3, 5, 8, 20])
+    assign_types = [rng.choice(types) for _ in range(count)]
+    use_maxes = rng.random() < 0.5
+    grades = []
+    for assign_type in assign_types:
+        top = type_maxes[assign_type] if use_maxes else 10
+        grades.append(_number(rng, 0, top * 1.05 if rng.random() < 0.03 else top))
+    data["grades"] = ",".join(grades)
+
+    if rng.random() < 0.7:
+        if rng.random() < 0.05:
+            assign_types.append(rng.choice(types))  # misaligned types are ignored
+        data["assignment_types"] = ",".join(assign_types)
+        if rng.random() < 0.8:
+            data["assignment_type_weights"] = json.dumps(
+                {t: rng.choice([0, 50, 100, 100, 150, 200]) for t in types if rng.random() < 0.9}
+            )
+        if use_maxes:
+            if rng.random() < 0.02:
+                type_maxes[rng.choice(types)] = 0
+            data["assignment_type_maxes"] = json.dumps(type_maxes)
+
+    test_count = rng.choice([0, 0, 1, 2, 3, 5])
+    test_maxes = [rng.choice([10, 20, 25, 100]) for _ in range(test_count)]
+    data["test_grades"] = ",".join(_number(rng, 0, m if rng.random() < 0.97 else m * 1.1) for m in test_maxes)
+    if test_count and rng.random() < 0.7:
+        data["test_maxes"] = ",".join(str(m) for m in test_maxes)
+    if rng.random() < 0.5:
+        data["total_tests"] = str(test_count + rng.choice([0, 0, 1, 2]))
+
+    if rng.random() < 0.6:
+        final_max = rng.choice([10, 20, 100])
+        data["final_grade"] = _number(rng, 0, final_max)
+        if final_max != 10 or rng.random() < 0.5:
+            data["final_max"] = str(final_max)
+
+    for key in ("weight_assignments", "weight_tests", "weight_final"):
+        if rng.random() < 0.5:
+            data[key] = rng.choice(["0", "10", "20", "25", "30", "40", "50", "60", str(rng.randint(0, 100))])
+    data["language"] = rng.choice(LANGUAGES)
+    return data
+
+
+# Comparison
+
+def differences(expected, actual, tolerance=1e-6, path="$"):
+    """List the paths where two responses differ; numbers compare within tolerance."""
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return [] if expected is actual else [f"{path}: {expected!r} != {actual!r}"]
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if math.isclose(expected, actual, rel_tol=0, abs_tol=tolerance):
+            return []
+        return [f"{path}: {expected!r} != {actual!r}"]
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        found = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in expected or key not in actual:
+                found.append(f"{path}.{key}: missing on one side")
+            else:
+                found.extend(differences(expected[key], actual[key], tolerance, f"{path}.{key}"))
+        return found
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        if len(expected) != len(actual):
+            return [f"{path}: length {len(expected)} != {len(actual)}"]
+        found = []
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            found.extend(differences(a, b, tolerance, f"{path}[{i}]"))
+        return found
+    return [] if expected == actual else [f"{path}: {expected!r} != {actual!r}"]
+
+
+def _outcome(engine, data):
+    try:
+        return engine(data)
+    except Exception as e:  # an exception is an outcome both sides must agree on
+        return "exception", type(e).__name__
+
+
+def mismatch(engine, data, tolerance=1e-6):
+    """Differences between the reference and engine for one input (empty if equal)."""
+    return differences(_outcome(reference_prediction, data), _outcome(engine, data), tolerance)
+
+
+# Shrinking
+
+_LIST_FIELDS = ("grades", "assignment_types", "test_grades", "test_maxes")
+_PAIRED_FIELDS = (("grades", "assignment_types"), ("test_grades", "test_maxes"))
+_JSON_FIELDS = ("assignment_type_weights", "assignment_type_maxes")
+
+
+def _candidates(data):
+    """Yield simpler variants of an input, most aggressive first."""
+    for key in data:
+        if key != "language":
+            yield {k: v for k, v in data.items() if k != key}
+
+    for first, second in _PAIRED_FIELDS:
+        a = data.get(first, "").split(",") if data.get(first) else []
+        b = data.get(second, "").split(",") if data.get(second) else []
+        for i in range(min(len(a), len(b))):
+            yield {**data, first: ",".join(a[:i] + a[i + 1:]), second: ",".join(b[:i] + b[i + 1:])}
+
+    for key in _LIST_FIELDS:
+        items = data.get(key, "").split(",") if data.get(key) else []
+        for i in range(len(items)):
+            yield {**data, key: ",".join(items[:i] + items[i + 1:])}
+
+    for key in _JSON_FIELDS:
+        try:
+            mapping = json.loads(data.get(key) or "{}")
+        except json.JSONDecodeError:
+            continue
+        if isinstance(mapping, dict):
+            for name in mapping:
+                yield {**data, key: json.dumps({k: v for k, v in mapping.items() if k != name})}
+
+    for key, value in data.items():
+        if key in ("language", "assignment_types") or key in _JSON_FIELDS:
+            continue
+        items = value.split(",")
+        for i, item in enumerate(items):
+            try:
+                number = float(item)
+            except ValueError:
+                continue
+            for simpler in ("0", str(int(number)), str(round(number, 1))):
+                if simpler != item.strip():
+                    yield {**data, key: ",".join(items[:i] + [simpler] + items[i + 1:])}
+
+    if data.get("language") != "en":
+        yield {**data, "language": "en"}
+
+
+def shrink(engine, data, tolerance=1e-6, max_steps=500):
+    """Greedily simplify a failing input while it keeps failing."""
+    steps = 0
+    progress = True
+    while progress and steps < max_steps:
+        progress = False
+        for candidate in _candidates(data):
+            steps += 1
+            if mismatch(engine, candidate, tolerance):
+                data = candidate
+                progress = True
+                break
+            if steps >= max_steps:
+                break
+    return data
+
+
+def run(engine, cases, seed=0, tolerance=1e-6):
+    """
+    Compare an engine with the reference on random inputs.
+
+    Returns None when all cases match, otherwise a dict with the seed-local
+    case number, the shrunk input and its differences.
+    """
+    rng = random.Random(seed)
+    for case_number in range(cases):
+        data = random_case(rng)
+        if mismatch(engine, data, tolerance):
+            minimal = shrink(engine, data, tolerance)
+            return {
+                "case": case_number,
+                "input": minimal,
+                "differences": mismatch(engine, minimal, tolerance),
+            }
+    return None
+
+
+# Engines under test
+
+def _error_response(error, language):
+    return 400, {"message": get_translation(error.key, language)}
+
+
+def _language(data):
+    language = data.get("language", "en")
+    return language if language in ['en', 'kk', 'ru'] else 'en'
+
+
+def calculator_engine(data):
+    """The calculator's shared engine: parse_grade_input() + predict()."""
+    from .grading import GradeInputError, parse_grade_input, predict
+
+    language = _language(data)
+    try:
+        return 200, predict(parse_grade_input(data), language)
+    except GradeInputError as e:
+        return _error_response(e, language)
+
+
+def gradebook_engine(data):
+    """Saved gradebook path: packed grades and cached aggregates (no database)."""
+    from .grading import GradeInputError, parse_grade_input
+    from .models import Gradebook
+
+    language = _language(data)
+    try:
+        parsed = parse_grade_input(data)
+    except GradeInputError as e:
+        return _error_response(e, language)
+    gradebook = Gradebook(student_key="differential", course="differential")
+    gradebook.set_grades(parsed)
+    return 200, gradebook.predict(language)
+
+
+def semester_engine(data):
+    """Semester overview with a single course."""
+    from .grading import GradeInputError, parse_grade_input, semester_overview
+
+    language = _language(data)
+    try:
+        parsed = parse_grade_input(data)
+    except GradeInputError as e:
+        return _error_response(e, language)
+    try:
+        course = semester_overview([{"name": "course", "credits": 1, "parsed": parsed}], language)["courses"][0]
+    except GradeInputError as e:
+        # Surface the exception the course raised so the comparison sees it
+        raise e.__cause__ or e
+    del course["name"], course["credits"]
+    return 200, course
+
+
+def class_engine(data):
+    """Class overview with a single student."""
+    from .grading import GradeInputError, class_overview, parse_grade_input, predict
+
+    language = _language(data)
+    try:
+        parsed = parse_grade_input(data)
+    except GradeInputError as e:
+        return _error_response(e, language)
+    overview = class_overview([{"name": "student", "parsed": parsed}], language)
+    if overview["rejected"]:
+        # Re-run the prediction so the comparison sees the exception it raised
+        predict(parsed, language)
+    row = overview["students"][0]
+    del row["name"]
+    return 200, row
+
+
+_answer_table = None
+_answer_table_directory = None
+
+
+def table_engine(data):
+    """Precomputed answer table with live fallback, built once into a temporary file."""
+    global _answer_table, _answer_table_directory
+    from .answer_table import AnswerTable, build
+    from .grading import GradeInputError, parse_grade_input, predict
+
+    if _answer_table is None:
+        # Removed when the process exits
+        _answer_table_directory = tempfile.TemporaryDirectory(prefix="answer-table-")
+        path = os.path.join(_answer_table_directory.name, "answers.bin")
+        build(path)
+        _answer_table = AnswerTable(path)
+
+    language = _language(data)
+    try:
+        parsed = parse_grade_input(data)
+    except GradeInputError as e:
+        return _error_response(e, language)
+    response_data = _answer_table.lookup(parsed, language)
+    return 200, response_data if response_data is not None else predict(parsed, language)
+
+
+ENGINES = {
+    "calculator": calculator_engine,
+    "gradebook": gradebook_engine,
+    "semester": semester_engine,
+    "class": class_engine,
+    "table": table_engine,
+}
@@ -0,0 +1,830 @@
+"""
+Grade prediction engine shared by the views.
+
+Everything here is plain Python with no request handling, so the same
+weighting logic backs the single-course calculator, saved gradebooks and
+any batch endpoints. All grades are on a 0-10 scale by the time they reach
+these functions.
+"""
+
+import json
+import math
+import statistics
+
+from .translations import get_translation
+
+# Grade thresholds (numeric grade: minimum percentage required)
+GRADES_PERCENT = {
+    5: 0.85,
+    4: 0.65,
+    3: 0.40,
+    2: 0.00,
+}
+
+# Letter grade mapping for English language
+LETTER_GRADES = {
+    5: 'A',
+    4: 'B',
+    3: 'C',
+    2: 'F'
+}
+
+LETTER_GRADE_RANGES = {
+    5: 'A (85-100%)',
+    4: 'B (65-84%)',
+    3: 'C (40-64%)',
+    2: 'F (0-39%)'
+}
+
+# Default weights (used as fallback)
+DEFAULT_WEIGHT_ASSIGNMENTS = 0.25
+DEFAULT_WEIGHT_TESTS = 0.25
+DEFAULT_WEIGHT_FINAL = 0.5
+
+# Default maximum values for different assessment types
+DEFAULT_MAX_ASSIGNMENT = 10.0
+DEFAULT_MAX_TEST = 10.0
+DEFAULT_MAX_FINAL = 10.0
+
+SUPPORTED_LANGUAGES = ['en', 'kk', 'ru']
+
+# Upper bound on extra perfect assignments searched for in the all-complete case
+MAX_EXTRA_ASSIGNMENTS = 20
+
+# Upper bound on courses accepted by one semester request
+MAX_SEMESTER_COURSES = 20
+
+# Upper bound on students accepted by one class request
+MAX_CLASS_STUDENTS = 5000
+
+# Percentiles of current percentages reported for a class
+CLASS_PERCENTILES = (10, 25, 50, 75, 90)
+
+# Upper bounds for one weight sweep request
+MAX_SWEEP_SCHEMES = 2000
+MAX_SWEEP_CELLS = 2_000_000
+
+
+class GradeInputError(ValueError):
+    """
+    Raised when submitted grades fail validation; carries a translation key
+    and, for multi-course requests, the name of the offending course.
+    """
+
+    def __init__(self, key, course=None):
+        super().__init__(key)
+        self.key = key
+        self.course = course
+
+
+def _split_numbers(value, cast=float):
+    """Parse a comma-separated string (or a list from JSON) into numbers."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [cast(v) for v in value if str(v).strip()]
+    return [cast(v) for v in str(value).split(",") if v.strip()]
+
+
+def _optional_number(value, cast=float):
+    if value is None or not str(value).strip():
+        return None
+    return cast(value)
+
+
+def _json_mapping(value):
+    """Decode a JSON object sent as a form string; JSON request bodies pass dicts through."""
+    if isinstance(value, str):
+        try:
+            return json.loads(value) if value else {}
+        except json.JSONDecodeError:
+            return {}
+    return value
+
+
+def _type_weights(value):
+    """Validate assignment type weights: a mapping of type to a finite percentage."""
+    if not value:
+        return {}
+    if not isinstance(value, dict) or not all(
+        isinstance(weight, (int, float)) and not isinstance(weight, bool) and math.isfinite(weight)
+        for weight in value.values()
+    ):
+        raise GradeInputError('invalid_request')
+    return value
+
+
+def normalize_assignment_grades(assign_grades, assign_types, assignment_type_maxes):
+    """
+    Scale assignment grades to the 0-10 scale using each type's maximum.
+
+    Grades whose type has no maximum (or that have no types at all) are
+    taken to be out of DEFAULT_MAX_ASSIGNMENT. Raises GradeInputError unless
+    the maximums are a mapping of positive finite numbers. Returns the
+    normalized grades and the sorted list of types that were actually rescaled.
+    """
+    if not assignment_type_maxes:
+        assignment_type_maxes = {}
+    elif not isinstance(assignment_type_maxes, dict):
+        raise GradeInputError('invalid_grades')
+    type_maxes = {}
+    for assign_type, max_val in assignment_type_maxes.items():
+        try:
+            max_val = float(max_val)
+        except (TypeError, ValueError):
+            raise GradeInputError('invalid_grades')
+        if not math.isfinite(max_val) or max_val <= 0:
+            raise GradeInputError('invalid_grades')
+        type_maxes[assign_type] = max_val
+
+    per_type = bool(type_maxes) and len(assign_types) == len(assign_grades)
+    if per_type:
+        grade_maxes = [type_maxes.get(assign_type, DEFAULT_MAX_ASSIGNMENT) for assign_type in assign_types]
+    else:
+        grade_maxes = [DEFAULT_MAX_ASSIGNMENT] * len(assign_grades)
+
+    for grade, max_val in zip(assign_grades, grade_maxes):
+        if grade > max_val:
+            # Without an explicit maximum the grade is simply off the 0-10 scale
+            raise GradeInputError('grade_exceeds_max' if max_val != DEFAULT_MAX_ASSIGNMENT else 'invalid_grades')
+
+    # Leave grades already on the default scale untouched so they round-trip exactly
+    normalized = [
+        grade if max_val == DEFAULT_MAX_ASSIGNMENT else (grade / max_val) * 10
+        for grade, max_val in zip(assign_grades, grade_maxes)
+    ]
+    rescaled_types = []
+    if per_type:
+        rescaled_types = sorted(
+            assign_type for assign_type in set(assign_types)
+            if type_maxes.get(assign_type, DEFAULT_MAX_ASSIGNMENT) != DEFAULT_MAX_ASSIGNMENT
+        )
+    return normalized, rescaled_types
+
+
+def normalize_weights(weight_assignments_percent, weight_tests_percent, weight_final_percent):
+    """
+    Convert percentage weights (0-100) to fractions that sum to 1.0.
+
+    Falls back to the default weights when all three are zero.
+    """
+    weight_assignments = weight_assignments_percent / 100.0
+    weight_tests = weight_tests_percent / 100.0
+    weight_final = weight_final_percent / 100.0
+
+    weight_total = weight_assignments + weight_tests + weight_final
+    if weight_total > 0:
+        return (
+            weight_assignments / weight_total,
+            weight_tests / weight_total,
+            weight_final / weight_total,
+        )
+    return DEFAULT_WEIGHT_ASSIGNMENTS, DEFAULT_WEIGHT_TESTS, DEFAULT_WEIGHT_FINAL
+
+
+def parse_grade_input(data):
+    """
+    Parse and validate calculator input.
+
+    ``data`` is any mapping with the calculator's POST keys (a QueryDict or a
+    dict decoded from JSON). Returns a dict with grades normalized to the
+    0-10 scale and weights normalized to fractions. Raises GradeInputError
+    for out-of-range or non-finite grades and malformed weights, and
+    ValueError for non-numeric input.
+    """
+    assign_grades = _split_numbers(data.get("grades", ""))
+    assign_types_raw = data.get("assignment_types", "")
+    if isinstance(assign_types_raw, (list, tuple)):
+        assign_types = [str(t).strip() for t in assign_types_raw if str(t).strip()]
+    else:
+        assign_types = [t.strip() for t in assign_types_raw.split(",") if t.strip()] if assign_types_raw else []
+
+    assignment_type_weights = _type_weights(_json_mapping(data.get("assignment_type_weights", "")))
+    assignment_type_maxes = _json_mapping(data.get("assignment_type_maxes", ""))
+
+    test_grades_raw = _split_numbers(data.get("test_grades", ""))
+    test_maxes = _split_numbers(data.get("test_maxes", ""))
+    final_grade_raw = _optional_number(data.get("final_grade", ""))
+    final_max = _optional_number(data.get("final_max", ""))
+    total_tests = _optional_number(data.get("total_tests", ""), cast=int)
+    if total_tests is None:
+        total_tests = len(test_grades_raw)
+
+    # float() accepts "nan" and "inf", which no comparison below would catch
+    numbers = [*assign_grades, *test_grades_raw, *test_maxes, final_grade_raw or 0.0, final_max or 0.0]
+    if not all(math.isfinite(number) for number in numbers):
+        raise GradeInputError('invalid_grades')
+
+    weight_percents = (
+        float(data.get("weight_assignments", DEFAULT_WEIGHT_ASSIGNMENTS * 100)),
+        float(data.get("weight_tests", DEFAULT_WEIGHT_TESTS * 100)),
+        float(data.get("weight_final", DEFAULT_WEIGHT_FINAL * 100)),
+    )
+    if not all(math.isfinite(weight) for weight in weight_percents):
+        raise GradeInputError('invalid_request')
+    weights = normalize_weights(*weight_percents)
+
+    # Normalize test grades to 0-10 scale
+    test_grades = []
+    if len(test_grades_raw) > 0:
+        if len(test_grades_raw) == len(test_maxes) and len(test_maxes) > 0:
+            for grade, max_val in zip(test_grades_raw, test_maxes):
+                if max_val <= 0:
+                    raise GradeInputError('invalid_grades')
+                if grade > max_val:
+                    raise GradeInputError('grade_exceeds_max')
+                test_grades.append((grade / max_val) * 10)
+        else:
+            # If maxes not provided or don't match, assume grades are already on 0-10 scale
+            test_grades = [min(grade, 10.0) for grade in test_grades_raw]
+
+    # Normalize final grade to 0-10 scale
+    final_grade = None
+    if final_grade_raw is not None:
+        if final_max is not None and final_max > 0:
+            if final_grade_raw > final_max:
+                raise GradeInputError('grade_exceeds_max')
+            final_grade = (final_grade_raw / final_max) * 10
+        else:
+            final_grade = min(final_grade_raw, 10.0)
+
+    if any(grade < 0 for grade in assign_grades) or any(grade < 0 for grade in test_grades):
+        raise GradeInputError('invalid_grades')
+    if final_grade is not None and final_grade < 0:
+        raise GradeInputError('invalid_grades')
+
+    assign_grades, rescaled_types = normalize_assignment_grades(assign_grades, assign_types, assignment_type_maxes)
+
+    return {
+        "assign_grades": assign_grades,
+        "assign_types": assign_types,
+        "assignment_type_weights": assignment_type_weights,
+        "test_grades": test_grades,
+        "final_grade": final_grade,
+        "total_tests": total_tests,
+        "weights": weights,
+        "rescaled_types": rescaled_types,
+    }
+
+
+def summarize_assignments(assign_grades, assign_types, assignment_type_weights):
+    """
+    Reduce assignment grades to the aggregates the prediction needs.
+
+    The weighted fields are only filled in when every grade has a type and
+    type weights were supplied; otherwise the plain average is used.
+    """
+    summary = {
+        "sum": sum(assign_grades),
+        "count": len(assign_grades),
+        "weighted_sum": None,
+        "weight_total": None,
+        "first_type_weight": None,
+    }
+    if assign_grades and assign_types and len(assign_types) == len(assign_grades) and assignment_type_weights:
+        weighted_sum = 0.0
+        weight_total = 0.0
+        for grade, assign_type in zip(assign_grades, assign_types):
+            # Assignment type weights are in percentages, convert to relative weights
+            type_weight = assignment_type_weights.get(assign_type, 100.0) / 100.0
+            weighted_sum += grade * type_weight
+            weight_total += type_weight
+        summary["weighted_sum"] = weighted_sum
+        summary["weight_total"] = weight_total
+        summary["first_type_weight"] = assignment_type_weights.get(assign_types[0], 100.0) / 100.0
+    return summary
+
+
+def assignment_average(summary):
+    """Average assignment grade from a summary, or None without assignments."""
+    if not summary["count"]:
+        return None
+    if summary["weighted_sum"] is not None and summary["weight_total"] > 0:
+        return summary["weighted_sum"] / summary["weight_total"]
+    return summary["sum"] / summary["count"]
+
+
+def grade_for_percent(percent):
+    """Map a 0-1 score to the numeric grade using GRADES_PERCENT."""
+    current_grade = 2  # Default lowest grade
+    for grade in sorted(GRADES_PERCENT.keys()):
+        if percent >= GRADES_PERCENT[grade]:
+            current_grade = grade
+    return current_grade
+
+
+def current_standing(assignments, test_sum, test_count, final_grade, weights):
+    """Return (current_score, current_percent, current_grade) on the 0-10 scale."""
+    weight_assignments, weight_tests, weight_final = weights
+    current_score = 0.0
+    weight_used = 0.0
+
+    assign_avg = assignment_average(assignments)
+    if assign_avg is not None:
+        current_score += assign_avg * weight_assignments
+        weight_used += weight_assignments
+
+    if test_count:
+        current_score += (test_sum / test_count) * weight_tests
+        weight_used += weight_tests
+
+    if final_grade is not None:
+        current_score += final_grade * weight_final
+        weight_used += weight_final
+
+    current_percent = current_score / 10 if weight_used > 0 else 0.0
+    return current_score, current_percent, grade_for_percent(current_percent)
+
+
+def _needed_extra_assignments(assignments, fixed_contribution, weight_assignments, target_threshold):
+    """Count perfect (10/10) assignments needed to reach target_threshold."""
+    n = 0
+    if assignments["count"] and assignments["weighted_sum"] is not None:
+        # Try adding perfect assignments (with the first type's weight) until we reach target
+        type_weight = assignments["first_type_weight"]
+        while n <= MAX_EXTRA_ASSIGNMENTS:
+            new_weighted_sum = assignments["weighted_sum"] + 10 * type_weight * n
+            new_total_weight = assignments["weight_total"] + type_weight * n
+            new_assign_avg = new_weighted_sum / new_total_weight if new_total_weight > 0 else 10
+            if new_assign_avg * weight_assignments + fixed_contribution >= target_threshold * 10:
+                break
+            n += 1
+    elif assignments["count"]:
+        while n <= MAX_EXTRA_ASSIGNMENTS:
+            count = assignments["count"] + n
+            new_assign_avg = (assignments["sum"] + 10 * n) / count if count > 0 else 10
+            if new_assign_avg * weight_assignments + fixed_contribution >= target_threshold * 10:
+                break
+            n += 1
+    else:
+        # No assignments yet: every added assignment is perfect
+        while n <= MAX_EXTRA_ASSIGNMENTS:
+            if 10.0 * weight_assignments + fixed_contribution >= target_threshold * 10:
+                break
+            n += 1
+    return n
+
+
+def predict_from_aggregates(assignments, test_sum, test_count, final_grade, total_tests, weights, language='en'):
+    """
+    Build the calculator response from pre-aggregated grades.
+
+    Args:
+        assignments: summary dict from summarize_assignments()
+        test_sum, test_count: sum and number of completed tests (0-10 scale)
+        final_grade: final exam grade (0-10 scale) or None if not taken
+        total_tests: number of tests expected in the course
+        weights: (assignments, tests, final) fractions summing to 1.0
+        language: language code for localized messages
+
+    Returns the response dict served by calculate_prediction.
+    """
+    weight_assignments, weight_tests, weight_final = weights
+    missing_tests = max(0, total_tests - test_count)
+    has_final = final_grade is not None
+
+    current_score, current_percent, current_grade = current_standing(
+        assignments, test_sum, test_count, final_grade, weights
+    )
+    target_grades = sorted(g for g in GRADES_PERCENT.keys() if g > current_grade)
+
+    # If already at highest grade
+    if not target_grades:
+        response_data = {
+            "message": get_translation('already_highest', language),
+            "current_grade": current_grade,
+            "current_percent": round(current_percent * 100, 2)
+        }
+        if language == 'en':
+            response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
+        return response_data
+
+    predictions = []
+
+    # Case 1: Missing tests or final exam
+    if missing_tests > 0 or not has_final:
+        missing_weight = 0.0
+        missing_parts = []
+        if missing_tests > 0:
+            missing_weight += weight_tests
+            missing_parts.append(f"{missing_tests} test(s)")
+        if not has_final:
+            missing_weight += weight_final
+            missing_parts.append("final exam")
+
+        for target_grade in target_grades:
+            target_threshold = GRADES_PERCENT[target_grade]
+
+            # Calculate required score on missing assessments
+            needed_score = (target_threshold * 10 - current_score) / missing_weight
+            needed_percent = (needed_score / 10) * 100
+
+            # If only final exam is missing, calculate specifically for final
+            needed_final_percent = None
+            if not has_final and missing_tests == 0:
+                if weight_final > 0:
+                    needed_final_score = (target_threshold * 10 - current_score) / weight_final
+                    needed_final_percent = (needed_final_score / 10) * 100
+                    if needed_final_score < 0:
+                        needed_final_score = 0
+                        needed_final_percent = 0
+                else:
+                    needed_final_score = 0
+                    needed_final_percent = 0
+
+            if needed_score < 0:
+                needed_score = 0
+                needed_percent = 0
+
+            pred = {
+                "target_grade": target_grade,
+                "needed_score": round(needed_score, 2),
+                "needed_percent": round(needed_percent, 2),
+                "reachable": needed_score <= 10,
+                "missing_parts": list(missing_parts)
+            }
+            if needed_final_percent is not None:
+                pred["needed_final_percent"] = round(needed_final_percent, 2)
+                pred["needed_final_score"] = round(needed_final_score, 2)
+            predictions.append(pred)
+
+        message_key = 'grade_predictions_remaining'
+
+    # Case 2: All assessments completed - calculate additional perfect assignments needed
+    else:
+        # Contribution from tests and final (these don't change)
+        fixed_contribution = 0.0
+        if test_count:
+            fixed_contribution += (test_sum / test_count) * weight_tests
+        fixed_contribution += final_grade * weight_final
+
+        for target_grade in target_grades:
+            target_threshold = GRADES_PERCENT[target_grade]
+            if current_score >= target_threshold * 10:
+                predictions.append({
+                    "target_grade": target_grade,
+                    "needed_tens": 0,
+                    "reachable": True,
+                    "message": "Already reached"
+                })
+                continue
+
+            n = _needed_extra_assignments(assignments, fixed_contribution, weight_assignments, target_threshold)
+            predictions.append({
+                "target_grade": target_grade,
+                "needed_tens": n if n <= MAX_EXTRA_ASSIGNMENTS else None,
+                "reachable": n <= MAX_EXTRA_ASSIGNMENTS
+            })
+
+        message_key = 'grade_predictions_assignments'
+
+    response_data = {
+        "message": get_translation(message_key, language),
+        "current_grade": current_grade,
+        "current_percent": round(current_percent * 100, 2),
+        "predictions": predictions,
+        "language": language
+    }
+    # Add letter grades for English
+    if language == 'en':
+        response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
+        for pred in predictions:
+            pred["target_grade_letter"] = LETTER_GRADES.get(pred["target_grade"], str(pred["target_grade"]))
+    return response_data
+
+
+def predict(parsed, language='en', assignments=None):
+    """
+    Run the full prediction for a dict returned by parse_grade_input().
+
+    ``assignments`` is the summarize_assignments() result when the caller
+    already has it.
+    """
+    if assignments is None:
+        assignments = summarize_assignments(
+            parsed["assign_grades"], parsed["assign_types"], parsed["assignment_type_weights"]
+        )
+    test_grades = parsed["test_grades"]
+    response_data = predict_from_aggregates(
+        assignments,
+        sum(test_grades),
+        len(test_grades),
+        parsed["final_grade"],
+        parsed["total_tests"],
+        parsed["weights"],
+        language,
+    )
+    if parsed.get("rescaled_types"):
+        response_data["rescaled_types"] = parsed["rescaled_types"]
+    return response_data
+
+
+def semester_overview(courses, language='en'):
+    """
+    Predict every course of a semester and rank where effort pays off most.
+
+    Args:
+        courses: list of dicts with "name", "credits" and "parsed" (the
+            output of parse_grade_input()) for each course
+        language: language code for localized messages
+
+    Returns a dict with the credit-weighted GPA on the numeric grade scale,
+    the per-course predictions, and a "focus" list of courses whose next
+    grade is still reachable. Focus is ordered by GPA gain per percentage
+    point the course total still has to rise, so a nearby step in a heavy
+    course ranks above a distant step in a light one.
+
+    Raises GradeInputError naming the course when a course cannot be predicted.
+    """
+    total_credits = sum(course["credits"] for course in courses)
+    breakdown = []
+    focus = []
+    weighted_grades = 0.0
+
+    for course in courses:
+        parsed = course["parsed"]
+        assignments = summarize_assignments(
+            parsed["assign_grades"], parsed["assign_types"], parsed["assignment_type_weights"]
+        )
+        test_sum = sum(parsed["test_grades"])
+        test_count = len(parsed["test_grades"])
+        try:
+            _, current_percent, current_grade = current_standing(
+                assignments, test_sum, test_count, parsed["final_grade"], parsed["weights"]
+            )
+            prediction = predict_from_aggregates(
+                assignments, test_sum, test_count, parsed["final_grade"],
+                parsed["total_tests"], parsed["weights"], language,
+            )
+        except ArithmeticError as e:
+            # e.g. zero weight on every missing part
+            raise GradeInputError('invalid_request', course=course["name"]) from e
+        if parsed.get("rescaled_types"):
+            prediction["rescaled_types"] = parsed["rescaled_types"]
+        weighted_grades += current_grade * course["credits"]
+        breakdown.append({"name": course["name"], "credits": course["credits"], **prediction})
+
+        next_prediction = (prediction.get("predictions") or [None])[0]
+        if next_prediction is None or not next_prediction["reachable"] or total_credits <= 0:
+            continue
+        gap_percent = max(GRADES_PERCENT[next_prediction["target_grade"]] - current_percent, 0.0) * 100
+        gpa_gain = course["credits"] / total_credits
+        focus.append({
+            "name": course["name"],
+            "target_grade": next_prediction["target_grade"],
+            "gap_percent": round(gap_percent, 2),
+            "gpa_gain": round(gpa_gain, 4),
+            # A zero gap (e.g. already past the threshold on paper) ranks first
+            "priority": round(gpa_gain / gap_percent, 4) if gap_percent > 0 else None,
+        })
+
+    focus.sort(key=lambda item: (item["priority"] is not None, -(item["priority"] or 0)))
+    gpa = weighted_grades / total_credits if total_credits > 0 else 0.0
+    response_data = {
+        "gpa": round(gpa, 2),
+        "total_credits": total_credits,
+        "courses": breakdown,
+        "focus": focus,
+        "language": language,
+    }
+    if language == 'en':
+        response_data["gpa_letter"] = LETTER_GRADES.get(round(gpa), str(round(gpa)))
+    return response_data
+
+
+def _percentiles(values, points):
+    """Percentiles (inclusive method) of a list of numbers, keyed "p<point>"."""
+    if not values:
+        return {f"p{point}": None for point in points}
+    if len(values) == 1:
+        return {f"p{point}": round(values[0], 2) for point in points}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {f"p{point}": round(cuts[point - 1], 2) for point in points}
+
+
+def class_overview(students, language='en'):
+    """
+    Predict every student of a class and aggregate the results for a teacher.
+
+    Args:
+        students: list of dicts with "name" and "parsed" (the output of
+            parse_grade_input()) for each student
+        language: language code for localized messages
+
+    Returns a dict with per-student rows (the calculate_prediction output plus
+    the name) and class aggregates collected in the same pass: students per
+    current grade, a 10-point histogram and percentiles of current
+    percentages, and for each target grade how many students have reached
+    it, can still reach it or cannot, with the median score still needed on
+    the remaining tests and final exam. Students whose prediction fails (e.g.
+    a zero weight on the only missing part) are left out of the aggregates
+    and listed under "rejected" with a message.
+    """
+    rows = []
+    percents = []
+    grade_counts = {grade: 0 for grade in sorted(GRADES_PERCENT)}
+    histogram = [0] * 10
+    reached = {grade: 0 for grade in grade_counts}
+    reachable = {grade: 0 for grade in grade_counts}
+    needed_scores = {grade: [] for grade in grade_counts}
+
+    rejected = []
+
+    for student in students:
+        try:
+            prediction = predict(student["parsed"], language)
+        except (ArithmeticError, TypeError, ValueError):
+            rejected.append({"name": student["name"], "message": get_translation('invalid_request', language)})
+            continue
+        rows.append({"name": student["name"], **prediction})
+
+        current_grade = prediction["current_grade"]
+        current_percent = prediction["current_percent"]
+        percents.append(current_percent)
+        grade_counts[current_grade] += 1
+        histogram[min(int(current_percent // 10), 9)] += 1
+        for grade in reached:
+            if grade <= current_grade:
+                reached[grade] += 1
+        for pred in prediction.get("predictions", ()):
+            target_grade = pred["target_grade"]
+            if pred["reachable"]:
+                if pred.get("needed_tens") == 0:
+                    reached[target_grade] += 1
+                else:
+                    reachable[target_grade] += 1
+            if "needed_score" in pred:
+                needed_scores[target_grade].append(pred["needed_score"])
+
+    count = len(rows)
+    targets = []
+    for grade in sorted(GRADES_PERCENT)[1:]:
+        target = {
+            "target_grade": grade,
+            "reached": reached[grade],
+            "reachable": reachable[grade],
+            "unreachable": count - reached[grade] - reachable[grade],
+            "median_needed_score": round(statistics.median(needed_scores[grade]), 2) if needed_scores[grade] else None,
+        }
+        if language == 'en':
+            target["target_grade_letter"] = LETTER_GRADES.get(grade, str(grade))
+        targets.append(target)
+
+    return {
+        "student_count": count,
+        "average_percent": round(sum(percents) / count, 2) if count else 0.0,
+        "grade_counts": grade_counts,
+        "percent_histogram": [
+            {"range": f"{low * 10}-{low * 10 + 10}", "count": n} for low, n in enumerate(histogram)
+        ],
+        "percentiles": _percentiles(percents, CLASS_PERCENTILES),
+        "targets": targets,
+        "students": rows,
+        "rejected": rejected,
+        "language": language,
+    }
+
+
+def weight_grid(step):
+    """Every (assignments, tests, final) percentage triple summing to 100 in ``step`` increments."""
+    return [
+        (assignments, tests, 100 - assignments - tests)
+        for assignments in range(0, 101, step)
+        for tests in range(0, 101 - assignments, step)
+        if (100 - assignments - tests) % step == 0
+    ]
+
+
+def _sweep_state(parsed):
+    """
+    The parts of a student's grades a weighting scheme can act on.
+
+    Returns (own assignment average or None, plain assignment average,
+    (grade, type) pairs or None when untyped, test average or None, final
+    grade or None). Equal states give equal grades under every scheme.
+    """
+    assign_grades = parsed["assign_grades"]
+    assign_types = parsed["assign_types"]
+    assignments = summarize_assignments(assign_grades, assign_types, parsed["assignment_type_weights"])
+    typed_grades = None
+    if assign_grades and assign_types and len(assign_types) == len(assign_grades):
+        typed_grades = tuple(zip(assign_grades, assign_types))
+    test_grades = parsed["test_grades"]
+    return (
+        assignment_average(assignments),
+        sum(assign_grades) / len(assign_grades) if assign_grades else None,
+        typed_grades,
+        sum(test_grades) / len(test_grades) if test_grades else None,
+        parsed["final_grade"],
+    )
+
+
+def _scheme_average(plain_average, typed_grades, type_weights):
+    """Assignment average under a scheme's type weights, summed as summarize_assignments() does."""
+    if typed_grades is None or not type_weights:
+        return plain_average
+    weighted_sum = 0.0
+    weight_total = 0.0
+    for grade, assign_type in typed_grades:
+        type_weight = type_weights.get(assign_type, 100.0) / 100.0
+        weighted_sum += grade * type_weight
+        weight_total += type_weight
+    return weighted_sum / weight_total if weight_total > 0 else plain_average
+
+
+def _sweep_percent(assign_avg, test_average, final_grade, weights):
+    """current_standing()'s percentage, accumulated in the same order."""
+    score = 0.0
+    if assign_avg is not None:
+        score += assign_avg * weights[0]
+    if test_average is not None:
+        score += test_average * weights[1]
+    if final_grade is not None:
+        score += final_grade * weights[2]
+    return score / 10
+
+
+def weight_sweep(students, schemes):
+    """
+    Evaluate a class under many weighting schemes at once.
+
+    Args:
+        students: list of parse_grade_input() dicts; each student's own
+            weights form the baseline
+        schemes: list of dicts with "weights" (assignments, tests, final
+            percentages) and optional "assignment_type_weights"
+
+    Students with identical grades are evaluated once and counted by
+    multiplicity, and each scheme is a tight loop over the distinct states,
+    mirroring current_standing() term by term so grades match the
+    calculator exactly. Returns the baseline distribution and, per scheme,
+    students per grade, the change against the baseline and how many
+    students move up or down.
+    """
+    thresholds = sorted(GRADES_PERCENT.items(), reverse=True)
+    lowest = min(GRADES_PERCENT)
+
+    def grade_of(percent):
+        for grade, threshold in thresholds:
+            if percent >= threshold:
+                return grade
+        return lowest
+
+    states = {}
+    for parsed in students:
+        key = (_sweep_state(parsed), parsed["weights"])
+        states[key] = states.get(key, 0) + 1
+
+    rows = []
+    baseline_counts = {grade: 0 for grade in sorted(GRADES_PERCENT)}
+    baseline_percent = 0.0
+    for ((own_average, plain_average, typed_grades, test_average, final_grade), own_weights), multiplicity in states.items():
+        percent = _sweep_percent(own_average, test_average, final_grade, own_weights)
+        grade = grade_of(percent)
+        baseline_counts[grade] += multiplicity
+        baseline_percent += percent * multiplicity
+        rows.append((own_average, plain_average, typed_grades, test_average, final_grade, grade, multiplicity))
+
+    total = len(students)
+    results = []
+    for scheme in schemes:
+        weights = normalize_weights(*scheme["weights"])
+        # None keeps each student's own type weights; a mapping replaces them
+        type_weights = scheme.get("assignment_type_weights")
+        counts = {grade: 0 for grade in baseline_counts}
+        raised = lowered = 0
+        percent_sum = 0.0
+        for own_average, plain_average, typed_grades, test_average, final_grade, baseline_grade, multiplicity in rows:
+            assign_avg = own_average
+            if type_weights is not None and own_average is not None:
+                assign_avg = _scheme_average(plain_average, typed_grades, type_weights)
+            percent = _sweep_percent(assign_avg, test_average, final_grade, weights)
+            grade = grade_of(percent)
+            counts[grade] += multiplicity
+            percent_sum += percent * multiplicity
+            if grade > baseline_grade:
+                raised += multiplicity
+            elif grade < baseline_grade:
+                lowered += multiplicity
+
+        result = {
+            "weights": [round(w * 100, 2) for w in weights],
+            "grade_counts": counts,
+            "grade_deltas": {grade: counts[grade] - baseline_counts[grade] for grade in counts},
+            "average_percent": round(percent_sum / total * 100, 2) if total else 0.0,
+            "raised": raised,
+            "lowered": lowered,
+        }
+        if type_weights is not None:
+            result["assignment_type_weights"] = type_weights
+        results.append(result)
+
+    return {
+        "student_count": total,
+        "distinct_students": len(rows),
+        "baseline": {
+            "grade_counts": baseline_counts,
+            "average_percent": round(baseline_percent / total * 100, 2) if total else 0.0,
+        },
+        "schemes": results,
+    }
@@ -0,0 +1,337 @@
+"""
+Bulk importer for e-diary (Kundelik-style) grade exports.
+
+Fetches a school's or class's marks over HTTP with bounded concurrency,
+per-thread keep-alive connections and retries with exponential backoff,
+maps each student's subjects onto the calculator's input fields and writes
+the results as saved gradebooks in bulk.
+
+Expected export endpoints (all JSON):
+
+    GET {base_url}/schools/{school_id}/classes
+        {"classes": [{"id": "7A"}, ...]}
+    GET {base_url}/classes/{class_id}/students
+        {"students": [{"id": "1001"}, ...]}
+    GET {base_url}/students/{student_id}/marks
+        {"subjects": [{
+            "name": "Algebra",
+            "weights": {"assignments": 25, "tests": 25, "final": 50},  # optional
+            "total_tests": 3,                                           # optional
+            "marks": [
+                {"kind": "assignment", "type": "Homework", "value": 8, "max": 10, "weight": 100},
+                {"kind": "test", "value": 17, "max": 20},
+                {"kind": "final", "value": 80, "max": 100}
+            ]
+        }, ...]}
+"""
+
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, urlsplit
+
+from django.db import transaction
+from django.utils import timezone
+
+from .grading import DEFAULT_MAX_ASSIGNMENT, GradeInputError, parse_grade_input
+from .models import Gradebook
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5
+DEFAULT_BATCH_SIZE = 500
+
+
+class EdiaryImportError(Exception):
+    """Raised when an export document cannot be fetched or decoded."""
+
+
+class ExportClient:
+    """
+    Minimal JSON client for the export API.
+
+    Each worker thread keeps its own keep-alive connection, so a pool of N
+    threads holds at most N open connections to the export server.
+    """
+
+    def __init__(self, base_url, token=None, timeout=10.0, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, sleep=time.sleep):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported export URL: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def get_json(self, path):
+        """GET a JSON document, retrying transient failures with exponential backoff."""
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        last_error = None
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                connection = self._connection()
+                connection.request("GET", self.base_path + path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._reset()
+                last_error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status == 200:
+                    try:
+                        return json.loads(body)
+                    except ValueError:
+                        # A broken body is not transient; retrying would fetch it again
+                        raise EdiaryImportError(f"GET {path} returned invalid JSON")
+                if response.status not in RETRY_STATUSES:
+                    raise EdiaryImportError(f"GET {path} returned {response.status}")
+                last_error = f"HTTP {response.status}"
+                retry_after = response.getheader("Retry-After")
+
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                self.sleep(delay)
+
+        raise EdiaryImportError(f"GET {path} failed after {self.retries + 1} attempts ({last_error})")
+
+
+def _assignment_type(mark):
+    # Types are joined with commas in form posts, so keep them comma-free
+    return str(mark.get("type") or "Default").replace(",", " ")
+
+
+def subject_to_input(subject):
+    """
+    Map one exported subject onto calculate_prediction's input fields.
+
+    Tests and the final exam keep their raw values and maximums, and
+    assignments use per-type maximums. A type whose marks have different
+    maximums is normalized to 0-10 here, because assignment_type_maxes
+    holds one maximum per type.
+    """
+    assignments = [m for m in subject.get("marks", []) if m.get("kind", "assignment") == "assignment"]
+    tests = [m for m in subject.get("marks", []) if m.get("kind") == "test"]
+    finals = [m for m in subject.get("marks", []) if m.get("kind") == "final"]
+
+    type_maxes = {}
+    mixed_types = set()
+    type_weights = {}
+    for mark in assignments:
+        assign_type = _assignment_type(mark)
+        max_val = float(mark.get("max", DEFAULT_MAX_ASSIGNMENT))
+        if type_maxes.setdefault(assign_type, max_val) != max_val:
+            mixed_types.add(assign_type)
+        type_weights.setdefault(assign_type, float(mark.get("weight", 100)))
+
+    grades = []
+    assign_types = []
+    for mark in assignments:
+        assign_type = _assignment_type(mark)
+        value = float(mark["value"])
+        if assign_type in mixed_types:
+            max_val = float(mark.get("max", DEFAULT_MAX_ASSIGNMENT))
+            if max_val <= 0:
+                raise GradeInputError('invalid_grades')
+            if value > max_val:
+                raise GradeInputError('grade_exceeds_max')
+            value = (value / max_val) * 10
+        grades.append(value)
+        assign_types.append(assign_type)
+
+    data = {
+        "grades": grades,
+        "assignment_types": assign_types,
+        "assignment_type_weights": type_weights,
+        "assignment_type_maxes": {t: m for t, m in type_maxes.items() if t not in mixed_types},
+        "test_grades": [float(m["value"]) for m in tests],
+        "test_maxes": [float(m.get("max", 10)) for m in tests],
+        "total_tests": max(int(subject.get("total_tests") or 0), len(tests)),
+    }
+    if finals:
+        # The latest final mark wins
+        data["final_grade"] = float(finals[-1]["value"])
+        data["final_max"] = float(finals[-1].get("max", 10))
+    weights = subject.get("weights") or {}
+    for key in ("assignments", "tests", "final"):
+        if key in weights:
+            data[f"weight_{key}"] = float(weights[key])
+    return data
+
+
+def _items(document, key, path):
+    """The list under ``key`` of an export document, or EdiaryImportError if malformed."""
+    items = document.get(key, []) if isinstance(document, dict) else None
+    if not isinstance(items, list):
+        raise EdiaryImportError(f"GET {path} returned no {key} list")
+    return items
+
+
+class ImportResult:
+    def __init__(self):
+        self.students = 0
+        self.created = 0
+        self.updated = 0
+        self.rejected = []  # (student_key, course, translation key)
+        self.failed = []  # ("class" or "student", id, error message)
+
+    def __repr__(self):
+        return (f"ImportResult(students={self.students}, created={self.created}, "
+                f"updated={self.updated}, rejected={len(self.rejected)}, failed={len(self.failed)})")
+
+
+class EdiaryImporter:
+    """Fetches marks concurrently and bulk-writes them as gradebooks."""
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                 key_prefix="ediary:"):
+        self.client = client
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.key_prefix = key_prefix
+
+    def class_ids_for_school(self, school_id):
+        path = f"/schools/{quote(str(school_id), safe='')}/classes"
+        classes = _items(self.client.get_json(path), "classes", path)
+        if not all(isinstance(c, dict) and "id" in c for c in classes):
+            raise EdiaryImportError(f"GET {path} returned a class without an id")
+        return [str(c["id"]) for c in classes]
+
+    def _roster(self, class_id):
+        path = f"/classes/{quote(str(class_id), safe='')}/students"
+        return _items(self.client.get_json(path), "students", path)
+
+    def _subjects(self, student_id):
+        path = f"/students/{quote(student_id, safe='')}/marks"
+        return _items(self.client.get_json(path), "subjects", path)
+
+    def import_school(self, school_id):
+        return self.import_classes(self.class_ids_for_school(school_id))
+
+    def import_classes(self, class_ids):
+        """
+        Import every student of the given classes; returns an ImportResult.
+
+        A class roster or student whose export cannot be fetched or decoded
+        is recorded in ``failed`` and the import carries on with the rest.
+        Batches are committed as they fill up, so gradebooks already written
+        stay in place whatever fails later.
+        """
+        result = ImportResult()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            roster_futures = {executor.submit(self._roster, class_id): str(class_id) for class_id in class_ids}
+            student_ids = []
+            for future in as_completed(roster_futures):
+                class_id = roster_futures[future]
+                try:
+                    roster = future.result()
+                except EdiaryImportError as e:
+                    result.failed.append(("class", class_id, str(e)))
+                    continue
+                for entry in roster:
+                    if isinstance(entry, dict) and "id" in entry:
+                        student_ids.append(str(entry["id"]))
+                    else:
+                        result.failed.append(("class", class_id, "roster entry without an id"))
+
+            mark_futures = {
+                executor.submit(self._subjects, student_id): student_id
+                for student_id in dict.fromkeys(student_ids)
+            }
+            pending = []
+            for future in as_completed(mark_futures):
+                student_id = mark_futures[future]
+                try:
+                    subjects = future.result()
+                except EdiaryImportError as e:
+                    result.failed.append(("student", student_id, str(e)))
+                    continue
+                student_key = f"{self.key_prefix}{student_id}"[:64]
+                result.students += 1
+                for subject in subjects:
+                    if not isinstance(subject, dict):
+                        result.rejected.append((student_key, "", 'invalid_request'))
+                        continue
+                    course = str(subject.get("name", ""))[:100]
+                    try:
+                        parsed = parse_grade_input(subject_to_input(subject))
+                    except GradeInputError as e:
+                        result.rejected.append((student_key, course, e.key))
+                        continue
+                    except (AttributeError, KeyError, TypeError, ValueError):
+                        # Malformed marks in the export
+                        result.rejected.append((student_key, course, 'invalid_request'))
+                        continue
+                    pending.append((student_key, course, parsed))
+                if len(pending) >= self.batch_size:
+                    self._write(pending, result)
+                    pending = []
+            if pending:
+                self._write(pending, result)
+        logger.info("E-diary import finished: %r", result)
+        return result
+
+    def _write(self, rows, result):
+        """Upsert a batch of gradebooks with one read, one bulk insert and one bulk update."""
+        rows = {(student_key, course): parsed for student_key, course, parsed in rows}
+        student_keys = {student_key for student_key, _ in rows}
+        existing = {
+            (g.student_key, g.course): g
+            for g in Gradebook.objects.filter(student_key__in=student_keys)
+            if (g.student_key, g.course) in rows
+        }
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for (student_key, course), parsed in rows.items():
+            gradebook = existing.get((student_key, course))
+            if gradebook is None:
+                gradebook = Gradebook(student_key=student_key, course=course)
+                to_create.append(gradebook)
+            else:
+                to_update.append(gradebook)
+            gradebook.set_grades(parsed)
+            gradebook.updated_at = now
+
+        with transaction.atomic():
+            Gradebook.objects.bulk_create(to_create, batch_size=self.batch_size)
+            Gradebook.objects.bulk_update(
+                to_update, fields=Gradebook.GRADE_FIELDS + ("updated_at",), batch_size=self.batch_size
+            )
+        result.created += len(to_create)
+        result.updated += len(to_update)
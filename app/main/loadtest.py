@@ -0,0 +1,282 @@
+"""
+Load generator for capacity planning.
+
+Replays an exam-week traffic mix against a running stack: page loads of
+home, /calculate/ posts spread across every prediction branch, and health
+probes at a fixed load-balancer rate. Load is stepped up by increasing
+the number of closed-loop clients; each step reports throughput, error
+rate and p50/p95/p99 latency. The highest throughput that still meets the
+latency SLOs is the sustainable RPS for that configuration.
+
+Everything runs locally with the standard library; see the loadtest
+management command for starting gunicorn with different worker counts.
+Targets may be http:// (gunicorn directly) or https:// (the nginx stack).
+"""
+
+import http.client
+import math
+import random
+import re
+import ssl
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+# Share of client requests per endpoint; health probes run separately
+TRAFFIC_MIX = (
+    ("home", 0.6),
+    ("calculate", 0.4),
+)
+
+# Calculator payloads covering every branch of calculate_prediction
+CALCULATE_PAYLOADS = (
+    # Missing final exam only
+    ({"grades": "7,8,6,9", "test_grades": "7,8", "total_tests": "2"}, 0.35),
+    # Missing tests and final exam
+    ({"grades": "8,8,8", "test_grades": "8", "total_tests": "3"}, 0.2),
+    # All complete: extra perfect assignments needed
+    ({"grades": "6,6,6", "test_grades": "6,6", "final_grade": "6"}, 0.15),
+    # Typed assignments with per-type maximums and custom weights
+    ({
+        "grades": "40,8,9,17",
+        "assignment_types": "Essay,Quiz,Quiz,Lab",
+        "assignment_type_weights": '{"Essay": 200, "Quiz": 100, "Lab": 150}',
+        "assignment_type_maxes": '{"Essay": 50, "Quiz": 10, "Lab": 20}',
+        "test_grades": "17,45",
+        "test_maxes": "20,50",
+        "total_tests": "3",
+        "weight_assignments": "30",
+        "weight_tests": "30",
+        "weight_final": "40",
+        "language": "ru",
+    }, 0.15),
+    # Already at the highest grade
+    ({"grades": "10,10", "test_grades": "10", "final_grade": "10", "language": "kk"}, 0.1),
+    # Rejected input
+    ({"grades": "8", "test_grades": "25", "test_maxes": "20"}, 0.05),
+)
+
+DEFAULT_SLO = {"p95_ms": 200.0, "p99_ms": 500.0, "error_rate": 0.01}
+
+_CSRF_COOKIE = re.compile(r"csrftoken=([A-Za-z0-9]+)")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (p in 0-100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _weighted_choice(rng, options):
+    threshold = rng.random() * sum(weight for _, weight in options)
+    for value, weight in options:
+        threshold -= weight
+        if threshold <= 0:
+            return value
+    return options[-1][0]
+
+
+class _Client:
+    """One closed-loop client with its own keep-alive connection and CSRF token."""
+
+    def __init__(self, base_url, seed, verify_tls=True):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported load test URL: {base_url}")
+        self.host = parts.hostname
+        self.port = parts.port
+        self.tls_context = None
+        if parts.scheme == "https":
+            # Self-signed staging certificates need verification turned off
+            self.tls_context = ssl.create_default_context() if verify_tls else ssl._create_unverified_context()
+        self.origin = f"https://{parts.netloc}"
+        self.rng = random.Random(seed)
+        self.connection = None
+        self.csrf_token = None
+
+    def _request(self, method, path, body=None, headers=None):
+        headers = {
+            # The app sits behind TLS-terminating nginx in production
+            "X-Forwarded-Proto": "https",
+            **(headers or {}),
+        }
+        for attempt in range(2):
+            if self.connection is None:
+                if self.tls_context is not None:
+                    self.connection = http.client.HTTPSConnection(
+                        self.host, self.port, timeout=30, context=self.tls_context
+                    )
+                else:
+                    self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                return response
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def home(self):
+        response = self._request("GET", "/")
+        match = _CSRF_COOKIE.search(response.getheader("Set-Cookie") or "")
+        if match:
+            self.csrf_token = match.group(1)
+        return response.status
+
+    def calculate(self):
+        if self.csrf_token is None:
+            self.home()
+        payload = _weighted_choice(self.rng, CALCULATE_PAYLOADS)
+        response = self._request("POST", "/calculate/", body=urlencode(payload), headers={
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Cookie": f"csrftoken={self.csrf_token}",
+            "X-CSRFToken": self.csrf_token or "",
+            "Origin": self.origin,
+            "Referer": f"{self.origin}/",
+        })
+        return response.status
+
+    def health(self):
+        return self._request("GET", "/health/").status
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def _expected(endpoint, status):
+    # The rejected-input payload legitimately answers 400
+    return status == 200 or (endpoint == "calculate" and status == 400)
+
+
+def run_step(base_url, clients, duration, health_interval=1.0, seed=0, verify_tls=True):
+    """
+    Run one load step with a fixed number of concurrent clients.
+
+    Returns a dict with request counts, throughput, error rate and latency
+    percentiles in milliseconds, overall and per endpoint. Raises ValueError
+    for URLs that are not http:// or https://.
+    """
+    # Fail here rather than separately inside every client thread
+    _Client(base_url, seed, verify_tls)
+    deadline = time.monotonic() + duration
+    lock = threading.Lock()
+    latencies = {}
+    errors = {}
+
+    def record(endpoint, started, ok):
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                errors[endpoint] = errors.get(endpoint, 0) + 1
+
+    def client_loop(index):
+        client = _Client(base_url, seed * 1000 + index, verify_tls)
+        try:
+            while time.monotonic() < deadline:
+                endpoint = _weighted_choice(client.rng, TRAFFIC_MIX)
+                started = time.perf_counter()
+                try:
+                    ok = _expected(endpoint, getattr(client, endpoint)())
+                except (OSError, http.client.HTTPException):
+                    ok = False
+                record(endpoint, started, ok)
+        finally:
+            client.close()
+
+    def health_loop():
+        client = _Client(base_url, seed, verify_tls)
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = _expected("health", client.health())
+                except (OSError, http.client.HTTPException):
+                    ok = False
+                record("health", started, ok)
+                time.sleep(max(0.0, min(health_interval, deadline - time.monotonic())))
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    if health_interval > 0:
+        threads.append(threading.Thread(target=health_loop))
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    def summarize(values, error_count):
+        values = sorted(values)
+        return {
+            "requests": len(values),
+            "errors": error_count,
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+
+    everything = [value for values in latencies.values() for value in values]
+    step = summarize(everything, sum(errors.values()))
+    step["clients"] = clients
+    step["rps"] = round(step["requests"] / elapsed, 1) if elapsed > 0 else 0.0
+    step["error_rate"] = round(step["errors"] / step["requests"], 4) if step["requests"] else 1.0
+    step["endpoints"] = {
+        endpoint: summarize(values, errors.get(endpoint, 0)) for endpoint, values in sorted(latencies.items())
+    }
+    return step
+
+
+def meets_slo(step, slo):
+    return (
+        step["requests"] > 0
+        and step["p95_ms"] <= slo["p95_ms"]
+        and step["p99_ms"] <= slo["p99_ms"]
+        and step["error_rate"] <= slo["error_rate"]
+    )
+
+
+def sustainable_rps(steps, slo):
+    """Highest throughput among steps that meet the SLO (0 if none do)."""
+    return max((step["rps"] for step in steps if meets_slo(step, slo)), default=0.0)
+
+
+def evaluate(report, slo, baseline=None, tolerance=0.2):
+    """
+    Check a report against the SLOs and optionally a baseline report.
+
+    Returns a list of human-readable failures (empty when everything passes).
+    A configuration fails when even its lightest step breaks the SLO, or
+    when compared to the baseline its sustainable RPS drops, or its
+    lightest-step p95 rises, by more than ``tolerance``.
+    """
+    failures = []
+    baseline_configs = {config["name"]: config for config in (baseline or {}).get("configs", [])}
+    for config in report["configs"]:
+        name = config["name"]
+        if not config["steps"] or not meets_slo(config["steps"][0], slo):
+            failures.append(f"{name}: lightest load step breaks the latency SLO")
+        previous = baseline_configs.get(name)
+        if previous is None:
+            continue
+        if config["sustainable_rps"] < previous["sustainable_rps"] * (1 - tolerance):
+            failures.append(
+                f"{name}: sustainable RPS {config['sustainable_rps']} regressed from {previous['sustainable_rps']}"
+            )
+        if previous["steps"] and config["steps"]:
+            old_p95 = previous["steps"][0]["p95_ms"]
+            new_p95 = config["steps"][0]["p95_ms"]
+            if new_p95 > old_p95 * (1 + tolerance):
+                failures.append(f"{name}: p95 {new_p95} ms regressed from {old_p95} ms")
+    return failures
@@ -0,0 +1,27 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.answer_table import DEFAULT_MAX_MISSING_TESTS, build
+
+
+class Command(BaseCommand):
+    help = "Precompute calculator answers for on-grid inputs into the memory-mapped answer table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Table path (default: ANSWER_TABLE_PATH)")
+        parser.add_argument("--max-missing-tests", type=int, default=DEFAULT_MAX_MISSING_TESTS,
+                            help="Largest number of missing tests to tabulate")
+
+    def handle(self, *args, **options):
+        path = options["output"] or settings.ANSWER_TABLE_PATH
+        if not path:
+            raise CommandError("Set ANSWER_TABLE_PATH or pass --output")
+        started = time.monotonic()
+        records = build(path, max_missing_tests=options["max_missing_tests"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {records} records ({os.path.getsize(path) / 1024:.0f} KiB) to {path} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
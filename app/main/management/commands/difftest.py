@@ -0,0 +1,33 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.differential import ENGINES, run
+
+
+class Command(BaseCommand):
+    help = "Compare prediction engines against the frozen reference on random inputs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=100000, help="Random inputs per engine")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--tolerance", type=float, default=1e-6, help="Allowed absolute numeric difference")
+        parser.add_argument("--engine", action="append", choices=sorted(ENGINES), help="Engine to check (repeatable; default all)")
+
+    def handle(self, *args, **options):
+        failed = False
+        for name in options["engine"] or sorted(ENGINES):
+            started = time.monotonic()
+            failure = run(ENGINES[name], options["cases"], options["seed"], options["tolerance"])
+            elapsed = time.monotonic() - started
+            if failure is None:
+                self.stdout.write(self.style.SUCCESS(f"{name}: {options['cases']} cases match ({elapsed:.1f}s)"))
+                continue
+            failed = True
+            self.stdout.write(self.style.ERROR(f"{name}: mismatch at case {failure['case']}"))
+            self.stdout.write(json.dumps(failure["input"], indent=2, ensure_ascii=False))
+            for difference in failure["differences"]:
+                self.stdout.write(f"  {difference}")
+        if failed:
+            raise CommandError("Engines differ from the reference implementation")
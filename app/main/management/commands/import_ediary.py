@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importer import (
+    DEFAULT_BACKOFF,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    EdiaryImporter,
+    EdiaryImportError,
+    ExportClient,
+)
+
+
+class Command(BaseCommand):
+    help = "Import grades from an e-diary JSON export into saved gradebooks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("base_url", help="Export API root, e.g. https://ediary.example/api/export")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--school", help="Import every class of this school")
+        target.add_argument("--class", dest="classes", action="append", help="Class to import (repeatable)")
+        parser.add_argument("--token", help="Bearer token for the export API")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Parallel requests")
+        parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+        parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="Initial retry delay in seconds")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Gradebooks per bulk write")
+
+    def handle(self, *args, **options):
+        try:
+            client = ExportClient(
+                options["base_url"],
+                token=options["token"],
+                timeout=options["timeout"],
+                retries=options["retries"],
+                backoff=options["backoff"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        importer = EdiaryImporter(client, concurrency=options["concurrency"], batch_size=options["batch_size"])
+
+        try:
+            if options["school"]:
+                result = importer.import_school(options["school"])
+            else:
+                result = importer.import_classes(options["classes"])
+        except EdiaryImportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.students} students: {result.created} gradebooks created, {result.updated} updated"
+        ))
+        for student_key, course, key in result.rejected:
+            self.stdout.write(self.style.WARNING(f"Skipped {student_key} / {course}: {key}"))
+        for kind, item_id, error in result.failed:
+            self.stdout.write(self.style.ERROR(f"Failed {kind} {item_id}: {error}"))
@@ -0,0 +1,148 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.loadtest import DEFAULT_SLO, evaluate, meets_slo, run_step, sustainable_rps
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"gunicorn exited with code {process.returncode}")
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            connection.request("GET", "/health/", headers={"X-Forwarded-Proto": "https"})
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.2)
+    raise CommandError("gunicorn did not become healthy in time")
+
+
+class Command(BaseCommand):
+    help = (
+        "Step up an exam-week traffic mix against local gunicorn instances (or --url) "
+        "and report latency percentiles and sustainable RPS per worker count."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", default="1,2,4", help="Comma-separated gunicorn worker counts to compare")
+        parser.add_argument("--gunicorn-args", default="", help="Extra gunicorn arguments, e.g. '--worker-class gthread --threads 4'")
+        parser.add_argument("--url", help="Test an already running stack (http:// or https://) instead of starting gunicorn")
+        parser.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification for an https --url")
+        parser.add_argument("--clients", default="1,2,4,8,16,32", help="Comma-separated concurrent clients per load step")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per load step")
+        parser.add_argument("--health-interval", type=float, default=1.0, help="Seconds between load balancer health probes")
+        parser.add_argument("--slo-p95", type=float, default=DEFAULT_SLO["p95_ms"], help="p95 latency SLO in ms")
+        parser.add_argument("--slo-p99", type=float, default=DEFAULT_SLO["p99_ms"], help="p99 latency SLO in ms")
+        parser.add_argument("--slo-error-rate", type=float, default=DEFAULT_SLO["error_rate"])
+        parser.add_argument("--baseline", help="Previous JSON report to check for regressions")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+        parser.add_argument("--report", help="Write the JSON report to this path")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            client_steps = [int(c) for c in options["clients"].split(",")]
+            worker_counts = [int(w) for w in options["workers"].split(",")]
+        except ValueError:
+            raise CommandError("--clients and --workers take comma-separated integers")
+        slo = {
+            "p95_ms": options["slo_p95"],
+            "p99_ms": options["slo_p99"],
+            "error_rate": options["slo_error_rate"],
+        }
+        if options["url"] and urlsplit(options["url"]).scheme not in ("http", "https"):
+            raise CommandError("--url must start with http:// or https://")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        configs = []
+        if options["url"]:
+            configs.append(self._run_config(options["url"], options["url"], client_steps, slo, options))
+        else:
+            for workers in worker_counts:
+                configs.append(self._run_gunicorn(workers, client_steps, slo, options))
+
+        report = {"slo": slo, "duration": options["duration"], "configs": configs}
+        failures = evaluate(report, slo, baseline, options["tolerance"])
+        report["failures"] = failures
+        if options["report"]:
+            with open(options["report"], "w") as f:
+                json.dump(report, f, indent=2)
+
+        for config in configs:
+            self.stdout.write(self.style.SUCCESS(
+                f"{config['name']}: sustainable {config['sustainable_rps']} RPS"
+            ))
+        if failures:
+            for failure in failures:
+                self.stdout.write(self.style.ERROR(failure))
+            raise CommandError("Latency SLO check failed")
+
+    def _run_gunicorn(self, workers, client_steps, slo, options):
+        port = _free_port()
+        env = {
+            **os.environ,
+            "ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "app.settings"),
+        }
+        command = [
+            sys.executable, "-m", "gunicorn", "app.wsgi:application",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers),
+            "--log-level", "warning",
+            *options["gunicorn_args"].split(),
+        ]
+        # Request logs from the server would drown the step table
+        output = None if options["verbosity"] > 1 else subprocess.DEVNULL
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=output, stderr=output)
+        try:
+            _wait_until_healthy(port, process)
+            name = f"workers={workers}"
+            if options["gunicorn_args"]:
+                name += f" {options['gunicorn_args']}"
+            return self._run_config(name, f"http://127.0.0.1:{port}", client_steps, slo, options)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def _run_config(self, name, base_url, client_steps, slo, options):
+        self.stdout.write(f"{name}")
+        self.stdout.write(f"  {'clients':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        steps = []
+        for clients in client_steps:
+            step = run_step(
+                base_url, clients, options["duration"], options["health_interval"], options["seed"],
+                verify_tls=not options["insecure"],
+            )
+            steps.append(step)
+            line = (
+                f"  {clients:>7} {step['rps']:>8} {step['p50_ms']:>8} {step['p95_ms']:>8} "
+                f"{step['p99_ms']:>8} {step['errors']:>7}"
+            )
+            self.stdout.write(line if meets_slo(step, slo) else self.style.WARNING(line + "  SLO breached"))
+            if not meets_slo(step, slo) and len(steps) > 1:
+                # Past saturation; heavier steps only add queueing
+                break
+        return {"name": name, "url": base_url, "steps": steps, "sustainable_rps": sustainable_rps(steps, slo)}
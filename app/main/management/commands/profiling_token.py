@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile header value for profiling requests without a staff session."
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(f"Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds, e.g.:")
+        self.stderr.write("  curl -i -H 'X-Profile: <token>' https://neverhard.com/")
+        # Without these, CsrfViewMiddleware answers 403 and only that gets profiled
+        self.stderr.write("POST endpoints also need the CSRF cookie, its X-CSRFToken header and, over HTTPS, a Referer:")
+        self.stderr.write("  curl -s -c cookies.txt -o /dev/null https://neverhard.com/")
+        self.stderr.write("  curl -i -b cookies.txt -H \"X-CSRFToken: $(awk '$6 == \"csrftoken\" {print $7}' cookies.txt)\" \\")
+        self.stderr.write("       -H 'Referer: https://neverhard.com/' -H 'X-Profile: <token>' \\")
+        self.stderr.write("       -d grades=8,9 https://neverhard.com/calculate/")
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Gradebook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_key', models.CharField(max_length=64)),
+                ('course', models.CharField(max_length=100)),
+                ('assignment_grades', models.BinaryField(default=bytes)),
+                ('assignment_type_ids', models.BinaryField(default=bytes)),
+                ('assignment_type_names', models.JSONField(default=list)),
+                ('assignment_type_weights', models.JSONField(default=dict)),
+                ('test_grades', models.BinaryField(default=bytes)),
+                ('final_grade', models.FloatField(blank=True, null=True)),
+                ('total_tests', models.PositiveIntegerField(default=0)),
+                ('weight_assignments', models.FloatField(default=0.25)),
+                ('weight_tests', models.FloatField(default=0.25)),
+                ('weight_final', models.FloatField(default=0.5)),
+                ('assign_sum', models.FloatField(default=0.0)),
+                ('assign_count', models.PositiveIntegerField(default=0)),
+                ('assign_weighted_sum', models.FloatField(blank=True, null=True)),
+                ('assign_weight_total', models.FloatField(blank=True, null=True)),
+                ('assign_first_type_weight', models.FloatField(blank=True, null=True)),
+                ('type_totals', models.JSONField(default=dict)),
+                ('test_sum', models.FloatField(default=0.0)),
+                ('test_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='gradebook',
+            constraint=models.UniqueConstraint(fields=('student_key', 'course'), name='unique_gradebook_per_course'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_gradebook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('metric', models.CharField(max_length=32)),
+                ('key', models.CharField(max_length=64)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-bucket_start', 'metric', 'key'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usagebucket',
+            constraint=models.UniqueConstraint(fields=('bucket_start', 'metric', 'key'), name='unique_usage_bucket'),
+        ),
+    ]
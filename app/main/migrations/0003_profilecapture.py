@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_usagebucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('total_calls', models.PositiveIntegerField(default=0)),
+                ('filename', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
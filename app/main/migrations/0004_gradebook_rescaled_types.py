@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_profilecapture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradebook',
+            name='rescaled_types',
+            field=models.JSONField(default=list),
+        ),
+    ]
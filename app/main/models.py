@@ -1,3 +1,284 @@
+import sys
+from array import array
+
 from django.db import models
 
-# Create your models here.
+from .grading import (
+    DEFAULT_WEIGHT_ASSIGNMENTS,
+    DEFAULT_WEIGHT_TESTS,
+    DEFAULT_WEIGHT_FINAL,
+    predict_from_aggregates,
+)
+
+
+def _pack(typecode, values):
+    """Pack numbers into little-endian bytes for a BinaryField."""
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(typecode, data):
+    unpacked = array(typecode)
+    if data:
+        unpacked.frombytes(bytes(data))
+        if sys.byteorder == 'big':
+            unpacked.byteswap()
+    return unpacked
+
+
+class Gradebook(models.Model):
+    """
+    A saved set of grades for one student in one course.
+
+    Grades are stored as packed float64 arrays (0-10 scale) rather than one
+    row per grade. The aggregates the prediction needs are cached alongside
+    and updated incrementally, so loading a gradebook and predicting is a
+    single indexed read with no re-aggregation.
+    """
+
+    student_key = models.CharField(max_length=64)
+    course = models.CharField(max_length=100)
+
+    # Packed grades
+    assignment_grades = models.BinaryField(default=bytes)
+    assignment_type_ids = models.BinaryField(default=bytes)
+    assignment_type_names = models.JSONField(default=list)
+    assignment_type_weights = models.JSONField(default=dict)
+    test_grades = models.BinaryField(default=bytes)
+    final_grade = models.FloatField(null=True, blank=True)
+    total_tests = models.PositiveIntegerField(default=0)
+    # Assignment types rescaled from their own maximum when the grades were saved
+    rescaled_types = models.JSONField(default=list)
+
+    # Component weights as fractions summing to 1.0
+    weight_assignments = models.FloatField(default=DEFAULT_WEIGHT_ASSIGNMENTS)
+    weight_tests = models.FloatField(default=DEFAULT_WEIGHT_TESTS)
+    weight_final = models.FloatField(default=DEFAULT_WEIGHT_FINAL)
+
+    # Cached aggregates
+    assign_sum = models.FloatField(default=0.0)
+    assign_count = models.PositiveIntegerField(default=0)
+    assign_weighted_sum = models.FloatField(null=True, blank=True)
+    assign_weight_total = models.FloatField(null=True, blank=True)
+    assign_first_type_weight = models.FloatField(null=True, blank=True)
+    type_totals = models.JSONField(default=dict)
+    test_sum = models.FloatField(default=0.0)
+    test_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Columns written by set_grades(), for bulk updates
+    GRADE_FIELDS = (
+        "assignment_grades", "assignment_type_ids", "assignment_type_names",
+        "assignment_type_weights", "test_grades", "final_grade", "total_tests",
+        "rescaled_types", "weight_assignments", "weight_tests", "weight_final",
+        "assign_sum", "assign_count", "assign_weighted_sum",
+        "assign_weight_total", "assign_first_type_weight", "type_totals",
+        "test_sum", "test_count",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student_key", "course"], name="unique_gradebook_per_course"),
+        ]
+
+    def __str__(self):
+        return f"{self.student_key} / {self.course}"
+
+    # Grades
+
+    def get_assignment_grades(self):
+        return list(_unpack('d', self.assignment_grades))
+
+    def get_assignment_types(self):
+        names = self.assignment_type_names
+        return [names[i] for i in _unpack('H', self.assignment_type_ids)]
+
+    def get_test_grades(self):
+        return list(_unpack('d', self.test_grades))
+
+    def _typed(self):
+        return bool(self.assignment_type_weights) and bool(self.assignment_type_names)
+
+    def _type_weight(self, assign_type):
+        # Assignment type weights are in percentages, convert to relative weights
+        return self.assignment_type_weights.get(assign_type, 100.0) / 100.0
+
+    def set_grades(self, parsed):
+        """Replace all grades from a parse_grade_input() dict and rebuild aggregates."""
+        assign_grades = parsed["assign_grades"]
+        assign_types = parsed["assign_types"]
+        type_weights = parsed["assignment_type_weights"]
+
+        typed = bool(assign_grades) and len(assign_types) == len(assign_grades) and bool(type_weights)
+        names = []
+        type_ids = []
+        if typed:
+            for assign_type in assign_types:
+                if assign_type not in names:
+                    names.append(assign_type)
+                type_ids.append(names.index(assign_type))
+
+        self.assignment_grades = _pack('d', assign_grades)
+        self.assignment_type_ids = _pack('H', type_ids)
+        self.assignment_type_names = names
+        self.assignment_type_weights = dict(type_weights) if typed else {}
+        self.test_grades = _pack('d', parsed["test_grades"])
+        self.final_grade = parsed["final_grade"]
+        self.total_tests = parsed["total_tests"]
+        self.rescaled_types = list(parsed.get("rescaled_types", []))
+        self.weight_assignments, self.weight_tests, self.weight_final = parsed["weights"]
+        self.recompute_aggregates()
+
+    def recompute_aggregates(self):
+        """Rebuild every cached aggregate from the packed grades."""
+        grades = _unpack('d', self.assignment_grades)
+        self.assign_sum = sum(grades)
+        self.assign_count = len(grades)
+        self.type_totals = {}
+        if grades and self._typed():
+            weighted_sum = 0.0
+            weight_total = 0.0
+            for grade, assign_type in zip(grades, self.get_assignment_types()):
+                type_weight = self._type_weight(assign_type)
+                weighted_sum += grade * type_weight
+                weight_total += type_weight
+                totals = self.type_totals.setdefault(assign_type, [0.0, 0])
+                totals[0] += grade
+                totals[1] += 1
+            self.assign_weighted_sum = weighted_sum
+            self.assign_weight_total = weight_total
+            self.assign_first_type_weight = self._type_weight(self.assignment_type_names[0])
+        else:
+            self.assign_weighted_sum = None
+            self.assign_weight_total = None
+            self.assign_first_type_weight = None
+
+        tests = _unpack('d', self.test_grades)
+        self.test_sum = sum(tests)
+        self.test_count = len(tests)
+
+    # Incremental updates
+
+    def update_assignment_grade(self, index, grade):
+        """Change one assignment grade and adjust the cached sums by the delta."""
+        grades = _unpack('d', self.assignment_grades)
+        delta = grade - grades[index]
+        grades[index] = grade
+        self.assignment_grades = _pack('d', grades)
+        self.assign_sum += delta
+        if self.assign_weighted_sum is not None:
+            assign_type = self.assignment_type_names[_unpack('H', self.assignment_type_ids)[index]]
+            self.assign_weighted_sum += delta * self._type_weight(assign_type)
+            self.type_totals[assign_type][0] += delta
+
+    def add_assignment_grade(self, grade, assign_type=None):
+        """Append an assignment grade, typed if the gradebook uses type weights."""
+        grades = _unpack('d', self.assignment_grades)
+        grades.append(grade)
+        self.assignment_grades = _pack('d', grades)
+        self.assign_sum += grade
+        self.assign_count += 1
+        if self.assign_weighted_sum is not None:
+            if assign_type not in self.assignment_type_names:
+                self.assignment_type_names = self.assignment_type_names + [assign_type]
+            type_ids = _unpack('H', self.assignment_type_ids)
+            type_ids.append(self.assignment_type_names.index(assign_type))
+            self.assignment_type_ids = _pack('H', type_ids)
+            type_weight = self._type_weight(assign_type)
+            self.assign_weighted_sum += grade * type_weight
+            self.assign_weight_total += type_weight
+            totals = self.type_totals.setdefault(assign_type, [0.0, 0])
+            totals[0] += grade
+            totals[1] += 1
+
+    def update_test_grade(self, index, grade):
+        """Change or append (index == count) one test grade."""
+        tests = _unpack('d', self.test_grades)
+        if index == len(tests):
+            tests.append(grade)
+            self.test_sum += grade
+            self.test_count += 1
+            self.total_tests = max(self.total_tests, self.test_count)
+        else:
+            self.test_sum += grade - tests[index]
+            tests[index] = grade
+        self.test_grades = _pack('d', tests)
+
+    def set_final_grade(self, grade):
+        self.final_grade = grade
+
+    # Prediction
+
+    def assignment_summary(self):
+        """Aggregates in the shape of grading.summarize_assignments()."""
+        return {
+            "sum": self.assign_sum,
+            "count": self.assign_count,
+            "weighted_sum": self.assign_weighted_sum,
+            "weight_total": self.assign_weight_total,
+            "first_type_weight": self.assign_first_type_weight,
+        }
+
+    def predict(self, language='en'):
+        """Prediction from the cached aggregates only, shaped like grading.predict()."""
+        response_data = predict_from_aggregates(
+            self.assignment_summary(),
+            self.test_sum,
+            self.test_count,
+            self.final_grade,
+            self.total_tests,
+            (self.weight_assignments, self.weight_tests, self.weight_final),
+            language,
+        )
+        if self.rescaled_types:
+            response_data["rescaled_types"] = list(self.rescaled_types)
+        return response_data
+
+
+class UsageBucket(models.Model):
+    """
+    Anonymous usage counts for one metric value in one time bucket.
+
+    Rows are written by main.analytics, which aggregates in memory and
+    upserts each bucket once per flush interval.
+    """
+
+    bucket_start = models.DateTimeField()
+    metric = models.CharField(max_length=32)
+    key = models.CharField(max_length=64)
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["bucket_start", "metric", "key"], name="unique_usage_bucket"),
+        ]
+        ordering = ["-bucket_start", "metric", "key"]
+
+    def __str__(self):
+        return f"{self.bucket_start:%Y-%m-%d %H:%M} {self.metric}={self.key}"
+
+
+class ProfileCapture(models.Model):
+    """
+    One profiled request, written by main.profiling.
+
+    The stats live in a pstats file under PROFILING_DIR; the row keeps what
+    the admin lists.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=200)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    total_calls = models.PositiveIntegerField(default=0)
+    filename = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms} ms)"
@@ -0,0 +1,135 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled only when it carries an X-Profile header and is
+authorized: either the header holds a token signed with the project's
+SECRET_KEY (see the profiling_token command), or the header is "1" and
+the request comes from a logged-in staff user. Everything else passes
+straight through after one header lookup, so normal traffic pays nothing.
+
+Profiled requests run under cProfile. The stats are dumped in pstats format
+(readable with pstats, snakeviz or flameprof) to PROFILING_DIR, recorded as
+a ProfileCapture for the admin, and the oldest captures beyond
+PROFILING_MAX_CAPTURES are deleted. The response carries X-Profile-Id.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+TOKEN_SALT = "main.profiling"
+
+# Only one profiler can be active per process; concurrent requests run unprofiled
+_profiler_lock = threading.Lock()
+
+
+def make_token():
+    """Signed token for the X-Profile header, valid for PROFILING_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign("profile")
+
+
+def _authorized(request, value):
+    if value == "1":
+        user = getattr(request, "user", None)
+        return bool(user is not None and user.is_active and user.is_staff)
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            value, max_age=getattr(settings, "PROFILING_TOKEN_MAX_AGE", 3600)
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_directory():
+    return getattr(settings, "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "gradepredict-profiles"))
+
+
+def top_functions(path, limit=25):
+    """The cumulative-time table of a stored profile, as text."""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
+
+
+def _enforce_retention():
+    from .models import ProfileCapture
+
+    max_captures = getattr(settings, "PROFILING_MAX_CAPTURES", 50)
+    stale = list(ProfileCapture.objects.order_by("-created_at", "-pk")[max_captures:])
+    for capture in stale:
+        try:
+            os.remove(os.path.join(profile_directory(), capture.filename))
+        except FileNotFoundError:
+            pass
+    if stale:
+        ProfileCapture.objects.filter(pk__in=[capture.pk for capture in stale]).delete()
+
+
+def _store(request, response, profiler, duration):
+    from .models import ProfileCapture
+
+    directory = profile_directory()
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(os.path.join(directory, filename))
+
+    capture = ProfileCapture.objects.create(
+        method=request.method,
+        path=request.path[:200],
+        status_code=response.status_code,
+        duration_ms=round(duration * 1000, 2),
+        total_calls=stats.total_calls,
+        filename=filename,
+    )
+    _enforce_retention()
+    return capture
+
+
+class ProfilingMiddleware:
+    """Profiles authorized requests that ask for it with the X-Profile header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = request.META.get(PROFILE_HEADER)
+        if not value or not _authorized(request, value):
+            return self.get_response(request)
+        if not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - started
+        finally:
+            _profiler_lock.release()
+
+        try:
+            capture = _store(request, response, profiler, duration)
+        except Exception as e:
+            # A failed capture must never break the profiled request
+            logger.error(f"Storing profile failed: {str(e)}")
+            return response
+        response["X-Profile-Id"] = str(capture.pk)
+        return response
@@ -0,0 +1,62 @@
+// Service worker for offline use. Rendered by views.service_worker so the
+// cache version and precache list always match the collectstatic manifest.
+const CACHE_VERSION = '{{ cache_version }}';
+const STATIC_CACHE = `static-${CACHE_VERSION}`;
+const SHELL_CACHE = `shell-${CACHE_VERSION}`;
+const STATIC_URL = '{{ static_url }}';
+const SHELL_URL = '{{ shell_url }}';
+const PRECACHE_URLS = {{ precache_urls|safe }};
+
+self.addEventListener('install', event => {
+    event.waitUntil(Promise.all([
+        caches.open(STATIC_CACHE).then(cache => cache.addAll(PRECACHE_URLS)),
+        caches.open(SHELL_CACHE).then(cache => cache.add(SHELL_URL)),
+    ]).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    // Drop caches from previous deployments
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key !== STATIC_CACHE && key !== SHELL_CACHE).map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    // Hashed static files never change under the same URL: cache first
+    if (url.pathname.startsWith(STATIC_URL)) {
+        event.respondWith(
+            caches.open(STATIC_CACHE).then(cache =>
+                cache.match(request).then(cached => cached || fetch(request).then(response => {
+                    if (response.ok) cache.put(request, response.clone());
+                    return response;
+                }))
+            )
+        );
+        return;
+    }
+
+    // App shell: network first, so the page carries the current CSRF token;
+    // the cached copy is only the offline fallback
+    if (request.mode === 'navigate' && url.pathname === SHELL_URL) {
+        event.respondWith(
+            caches.open(SHELL_CACHE).then(cache =>
+                fetch(request)
+                    .then(response => {
+                        if (response.ok) cache.put(SHELL_URL, response.clone());
+                        return response;
+                    })
+                    .catch(() => cache.match(SHELL_URL).then(cached => cached || Response.error()))
+            )
+        );
+    }
+});
@@ -1,6 +1,32 @@
-from django.test import RequestFactory, TestCase
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from django.test import LiveServerTestCase, RequestFactory, TestCase, override_settings
 import json
-from main.views import calculate_prediction
+import os
+import random
+import ssl
+import tempfile
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from main import answer_table, differential, loadtest, profiling
+from main.importer import EdiaryImporter, EdiaryImportError, ExportClient
+from django.contrib.auth.models import User
+from main.analytics import UsageAggregator
+from main.grading import parse_grade_input, predict, weight_grid
+from main.models import Gradebook, ProfileCapture, UsageBucket
+from main.views import (
+    calculate_class,
+    calculate_prediction,
+    calculate_semester,
+    calculate_weight_sweep,
+    class_dashboard,
+    load_gradebook,
+    save_gradebook,
+    service_worker,
+    update_gradebook_grade,
+)
 
 class CalculatePredictionTests(TestCase):
     def setUp(self):
@@ -160,4 +186,846 @@ class CalculatePredictionTests(TestCase):
         # To reach grade 3 (40%): need 4.0/10 total
         # Need from final: (4.0 - 3.75) / 0.5 = 0.5
         self.assertIn("needed_score", data)
-        self.assertAlmostEqual(data["needed_score"], 0.5, places=1)
\ No newline at end of file
+        self.assertAlmostEqual(data["needed_score"], 0.5, places=1)
+    
+    def test_assignment_type_maxes_rescale_raw_grades(self):
+        """Raw assignment grades are normalized per type on the server"""
+        raw = self._post({
+            "grades": "40,8",
+            "assignment_types": "Essay,Quiz",
+            "assignment_type_weights": json.dumps({"Essay": 100, "Quiz": 100}),
+            "assignment_type_maxes": json.dumps({"Essay": 50, "Quiz": 10}),
+            "test_grades": "8",
+            "final_grade": "8",
+        })
+        scaled = self._post({
+            "grades": "8,8",
+            "assignment_types": "Essay,Quiz",
+            "assignment_type_weights": json.dumps({"Essay": 100, "Quiz": 100}),
+            "test_grades": "8",
+            "final_grade": "8",
+        })
+        self.assertEqual(raw.pop("rescaled_types"), ["Essay"])
+        self.assertEqual(raw, scaled)
+    
+    def test_assignment_grade_exceeds_type_max(self):
+        """Grades above their type maximum are rejected"""
+        request = self.factory.post("/predict/", {
+            "grades": "21",
+            "assignment_types": "Lab",
+            "assignment_type_maxes": json.dumps({"Lab": 20}),
+        })
+        response = calculate_prediction(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("maximum", json.loads(response.content)["message"])
+    
+    def test_malformed_type_maxes_are_rejected(self):
+        """Type maximums must be a mapping of positive numbers"""
+        for maxes in ('{"Lab": null}', '{"Lab": "abc"}', '{"Lab": "nan"}', '[10]', '10'):
+            request = self.factory.post("/predict/", {
+                "grades": "8",
+                "assignment_types": "Lab",
+                "assignment_type_maxes": maxes,
+            })
+            response = calculate_prediction(request)
+            self.assertEqual(response.status_code, 400)
+
+class GradebookTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.teacher = User.objects.create_user("teacher", is_staff=True)
+    
+    def _as_teacher(self, request):
+        request.user = self.teacher
+        return request
+    
+    def _save(self, data):
+        data = {"student": "s1", "course": "Math", **data}
+        response = save_gradebook(self._as_teacher(self.factory.post("/gradebook/save/", data)))
+        return json.loads(response.content)
+    
+    def _update(self, data):
+        data = {"student": "s1", "course": "Math", **data}
+        response = update_gradebook_grade(self._as_teacher(self.factory.post("/gradebook/grade/", data)))
+        return json.loads(response.content)
+    
+    def _calculate(self, data):
+        return json.loads(calculate_prediction(self.factory.post("/calculate/", data)).content)
+    
+    def test_save_matches_calculator(self):
+        """Saved gradebook predictions match a direct calculation"""
+        data = {
+            "grades": "7,9,6",
+            "assignment_types": "HW,Quiz,HW",
+            "assignment_type_weights": json.dumps({"HW": 100, "Quiz": 200}),
+            "assignment_type_maxes": json.dumps({"Quiz": 20}),
+            "test_grades": "15,8",
+            "test_maxes": "20,10",
+            "total_tests": "3",
+        }
+        saved = self._save(data)
+        expected = self._calculate(data)
+        self.assertEqual(expected["rescaled_types"], ["Quiz"])
+        saved.pop("gradebook_id")
+        self.assertEqual(saved, expected)
+        self.assertEqual(Gradebook.objects.count(), 1)
+        
+        request = self.factory.get("/gradebook/", {"student": "s1", "course": "Math"})
+        loaded = json.loads(load_gradebook(self._as_teacher(request)).content)
+        self.assertEqual(loaded["rescaled_types"], ["Quiz"])
+    
+    def test_save_replaces_existing_row(self):
+        """One row per student and course"""
+        self._save({"grades": "5,5"})
+        self._save({"grades": "9,9"})
+        gradebook = Gradebook.objects.get()
+        self.assertEqual(gradebook.get_assignment_grades(), [9.0, 9.0])
+        self.assertEqual(gradebook.assign_sum, 18.0)
+    
+    def test_first_save_that_loses_the_insert_race(self):
+        """A save whose row was created concurrently updates it instead of failing"""
+        self._save({"grades": "5"})
+        real_get = QuerySet.get
+        missed = []
+        
+        def racing_get(queryset, *args, **kwargs):
+            # The first read misses, as if the other request had not committed yet
+            if not missed:
+                missed.append(True)
+                raise Gradebook.DoesNotExist
+            return real_get(queryset, *args, **kwargs)
+        
+        with mock.patch.object(QuerySet, "get", racing_get):
+            self._save({"grades": "7"})
+        self.assertTrue(missed)
+        self.assertEqual(Gradebook.objects.get().get_assignment_grades(), [7.0])
+    
+    def test_load_returns_grades_and_predictions(self):
+        """Loading returns stored grades alongside predictions"""
+        self._save({"grades": "8,8", "test_grades": "8,8"})
+        request = self.factory.get("/gradebook/", {"student": "s1", "course": "Math"})
+        data = json.loads(load_gradebook(self._as_teacher(request)).content)
+        self.assertEqual(data["grades"], [8.0, 8.0])
+        self.assertEqual(data["test_grades"], [8.0, 8.0])
+        self.assertAlmostEqual(data["predictions"][0]["needed_score"], 5.0, places=2)
+    
+    def test_load_unknown_gradebook(self):
+        """Unknown gradebooks return 404"""
+        request = self.factory.get("/gradebook/", {"student": "nobody", "course": "Math"})
+        self.assertEqual(load_gradebook(self._as_teacher(request)).status_code, 404)
+    
+    def test_incremental_update_matches_full_recompute(self):
+        """Single-grade updates keep cached aggregates consistent"""
+        self._save({
+            "grades": "4,6,8",
+            "assignment_types": "HW,Lab,HW",
+            "assignment_type_weights": json.dumps({"HW": 100, "Lab": 50}),
+            "test_grades": "5",
+            "total_tests": "2",
+        })
+        self._update({"component": "assignment", "index": "1", "grade": "10"})
+        self._update({"component": "assignment", "grade": "9", "assignment_type": "Lab"})
+        self._update({"component": "test", "grade": "14", "max": "20"})
+        result = self._update({"component": "final", "grade": "7"})
+        
+        expected = self._calculate({
+            "grades": "4,10,8,9",
+            "assignment_types": "HW,Lab,HW,Lab",
+            "assignment_type_weights": json.dumps({"HW": 100, "Lab": 50}),
+            "test_grades": "5,7",
+            "final_grade": "7",
+        })
+        result.pop("gradebook_id")
+        self.assertEqual(result, expected)
+        
+        gradebook = Gradebook.objects.get()
+        cached = gradebook.assignment_summary()
+        gradebook.recompute_aggregates()
+        for key, value in gradebook.assignment_summary().items():
+            self.assertAlmostEqual(cached[key], value)
+        self.assertEqual(gradebook.type_totals["Lab"], [19.0, 2])
+    
+    def test_update_rejects_out_of_range_index(self):
+        """Updating a grade that does not exist is rejected"""
+        self._save({"grades": "5"})
+        response = update_gradebook_grade(self._as_teacher(self.factory.post("/gradebook/grade/", {
+            "student": "s1", "course": "Math", "component": "assignment", "index": "3", "grade": "5",
+        })))
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_numeric_input_is_rejected(self):
+        """Missing or non-numeric grades and indexes return 400, not a server error"""
+        self._save({"grades": "5"})
+        for data in ({"grade": ""}, {"grade": "abc"}, {"grade": "5", "index": "x"}, {"grade": "nan"}):
+            response = update_gradebook_grade(self._as_teacher(self.factory.post("/gradebook/grade/", {
+                "student": "s1", "course": "Math", "component": "assignment", **data,
+            })))
+            self.assertEqual(response.status_code, 400)
+        response = save_gradebook(self._as_teacher(self.factory.post("/gradebook/save/", {
+            "student": "s1", "course": "Math", "grades": "5,abc",
+        })))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Gradebook.objects.get().get_assignment_grades(), [5.0])
+    
+    def test_requires_staff_session(self):
+        """Anonymous visitors and non-staff users cannot read or change gradebooks"""
+        self._save({"grades": "5"})
+        student = User.objects.create_user("student")
+        for user in (None, student):
+            requests = [
+                self.factory.get("/gradebook/", {"student": "s1", "course": "Math"}),
+                self.factory.post("/gradebook/save/", {"student": "s1", "course": "Math", "grades": "1"}),
+                self.factory.post("/gradebook/grade/", {
+                    "student": "s1", "course": "Math", "component": "assignment", "grade": "1",
+                }),
+            ]
+            for request, view in zip(requests, (load_gradebook, save_gradebook, update_gradebook_grade)):
+                if user is not None:
+                    request.user = user
+                self.assertEqual(view(request).status_code, 403)
+        self.assertEqual(Gradebook.objects.get().get_assignment_grades(), [5.0])
+
+
+class SemesterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+    
+    def _post(self, payload):
+        request = self.factory.post("/semester/", json.dumps(payload), content_type="application/json")
+        response = calculate_semester(request)
+        return response.status_code, json.loads(response.content)
+    
+    def test_courses_match_single_course_calculation(self):
+        """Each course in the breakdown matches calculate_prediction"""
+        course = {
+            "grades": "7,8,6,18", "assignment_types": "HW,HW,HW,Essay",
+            "assignment_type_weights": json.dumps({"HW": 100, "Essay": 100}),
+            "assignment_type_maxes": json.dumps({"Essay": 20}),
+            "test_grades": "7,8", "final_grade": "", "total_tests": "2",
+        }
+        status, data = self._post({"courses": [{"name": "Math", **course}]})
+        self.assertEqual(status, 200)
+        expected = json.loads(calculate_prediction(self.factory.post("/calculate/", course)).content)
+        self.assertEqual(expected["rescaled_types"], ["Essay"])
+        breakdown = data["courses"][0]
+        self.assertEqual(breakdown.pop("name"), "Math")
+        self.assertEqual(breakdown.pop("credits"), 1)
+        self.assertEqual(breakdown, expected)
+    
+    def test_gpa_is_credit_weighted(self):
+        """GPA weights each course's current grade by its credits"""
+        status, data = self._post({"courses": [
+            {"name": "Math", "credits": 3, "grades": [10, 10], "test_grades": [10], "final_grade": 10},
+            {"name": "Art", "credits": 1, "grades": [0], "test_grades": [0], "final_grade": 0},
+        ]})
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(data["gpa"], (5 * 3 + 2 * 1) / 4)
+    
+    def test_focus_prefers_closest_heavy_course(self):
+        """Courses just below a threshold with more credits rank first"""
+        status, data = self._post({"courses": [
+            {"name": "Far", "credits": 1, "grades": [5], "test_grades": [5], "total_tests": 2},
+            {"name": "Near", "credits": 2, "grades": [6.4], "test_grades": [6.4], "final_grade": 6.4},
+            {"name": "Done", "credits": 1, "grades": [10], "test_grades": [10], "final_grade": 10},
+        ]})
+        self.assertEqual(status, 200)
+        self.assertEqual([item["name"] for item in data["focus"]], ["Near", "Far"])
+        self.assertEqual(data["focus"][0]["target_grade"], 4)
+    
+    def test_invalid_course_reports_name(self):
+        """Validation errors identify the offending course"""
+        status, data = self._post({"courses": [{"name": "Bio", "test_grades": [12], "test_maxes": [10]}]})
+        self.assertEqual(status, 400)
+        self.assertEqual(data["course"], "Bio")
+    
+    def test_rejects_missing_courses(self):
+        """A body without courses is rejected"""
+        status, _ = self._post({"courses": []})
+        self.assertEqual(status, 400)
+
+    def test_rejects_non_finite_credits(self):
+        """NaN or infinite credits are rejected instead of producing invalid JSON"""
+        for credits in ("nan", "inf", "-inf"):
+            status, data = self._post({"courses": [{"name": "Math", "credits": credits, "grades": [8]}]})
+            self.assertEqual(status, 400)
+            self.assertEqual(data["course"], "Math")
+    
+    def test_unpredictable_course_is_rejected(self):
+        """Zero weight on the only missing part returns 400 naming the course, not a server error"""
+        status, data = self._post({"courses": [
+            {"name": "Math", "grades": [8], "test_grades": [7]},
+            {"name": "Art", "grades": [8], "test_grades": [7], "weight_final": 0},
+        ]})
+        self.assertEqual(status, 400)
+        self.assertEqual(data["course"], "Art")
+
+
+class ClassDashboardTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+    
+    def _post(self, payload):
+        request = self.factory.post("/class/stats/", json.dumps(payload), content_type="application/json")
+        response = calculate_class(request)
+        return response.status_code, json.loads(response.content)
+    
+    def test_rows_match_single_student_calculation(self):
+        """Each student row matches calculate_prediction"""
+        student = {"grades": "7,8,6,9", "test_grades": "7,8", "final_grade": "", "total_tests": "2"}
+        status, data = self._post({"students": [{"name": "Aruzhan", **student}]})
+        self.assertEqual(status, 200)
+        expected = json.loads(calculate_prediction(self.factory.post("/calculate/", student)).content)
+        row = data["students"][0]
+        self.assertEqual(row.pop("name"), "Aruzhan")
+        self.assertEqual(row, expected)
+    
+    def test_class_aggregates(self):
+        """Grade counts, histogram, percentiles and target counts cover the class"""
+        status, data = self._post({"students": [
+            {"name": "A", "grades": [10], "test_grades": [10], "final_grade": 10},
+            {"name": "B", "grades": [7], "test_grades": [7], "total_tests": 2},
+            {"name": "C", "grades": [2], "test_grades": [2], "total_tests": 1},
+            {"name": "D", "grades": [3], "test_grades": [3], "final_grade": 3},
+        ]})
+        self.assertEqual(status, 200)
+        self.assertEqual(data["student_count"], 4)
+        self.assertEqual(data["grade_counts"], {"2": 3, "3": 0, "4": 0, "5": 1})
+        self.assertEqual(sum(b["count"] for b in data["percent_histogram"]), 4)
+        self.assertEqual(data["percent_histogram"][9]["count"], 1)
+        self.assertEqual(data["percentiles"]["p50"], 32.5)
+        targets = {t["target_grade"]: t for t in data["targets"]}
+        # B needs 0.67 on the remaining test and final, C needs 6.0 on the final;
+        # D is complete and needs more assignments instead
+        self.assertEqual(targets[3], {
+            "target_grade": 3, "reached": 1, "reachable": 3, "unreachable": 0,
+            "median_needed_score": 3.33, "target_grade_letter": "C",
+        })
+        self.assertEqual(targets[5]["reached"], 1)
+        self.assertEqual(targets[5]["reachable"], 1)
+        self.assertEqual(targets[5]["unreachable"], 2)
+    
+    def test_invalid_students_are_reported_not_fatal(self):
+        status, data = self._post({"language": "ru", "students": [
+            {"name": "Ok", "grades": [8], "test_grades": [8]},
+            {"name": "Bad", "test_grades": [12], "test_maxes": [10]},
+            "not a student",
+        ]})
+        self.assertEqual(status, 200)
+        self.assertEqual(data["student_count"], 1)
+        self.assertEqual([row["name"] for row in data["rejected"]], ["Bad", "3"])
+        self.assertNotIn("target_grade_letter", data["targets"][0])
+    
+    def test_students_that_cannot_be_predicted_are_rejected(self):
+        """Zero weight on the only missing part, non-finite grades and bad type weights skip one student"""
+        status, data = self._post({"students": [
+            {"name": "Ok", "grades": [8], "test_grades": [8]},
+            {"name": "NoFinalWeight", "grades": [8], "test_grades": [8], "weight_final": 0},
+            {"name": "NaN", "grades": ["nan"], "test_grades": [8]},
+            {"name": "Inf", "grades": [8], "weight_tests": "inf"},
+            {"name": "Types", "grades": [8], "assignment_types": ["HW"], "assignment_type_weights": {"HW": "x"}},
+            {"name": "TypeList", "grades": [8], "assignment_types": ["HW"], "assignment_type_weights": [100]},
+        ]})
+        self.assertEqual(status, 200)
+        self.assertEqual(data["student_count"], 1)
+        self.assertEqual(
+            sorted(row["name"] for row in data["rejected"]),
+            ["Inf", "NaN", "NoFinalWeight", "TypeList", "Types"],
+        )
+    
+    def test_rejects_empty_roster(self):
+        status, _ = self._post({"students": []})
+        self.assertEqual(status, 400)
+    
+    def test_dashboard_page(self):
+        response = class_dashboard(self.factory.get("/class/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "/class/stats/")
+
+
+class WeightSweepTests(TestCase):
+    STUDENTS = [
+        # 25/25/50: 8.5 -> 5; 30/30/40: 8.2 -> 4
+        {"name": "A", "grades": [7], "test_grades": [7], "final_grade": 10},
+        # 25/25/50: 6.0 -> 3; 30/30/40: 6.4 -> 3
+        {"name": "B", "grades": [8], "test_grades": [8], "final_grade": 4},
+        {"name": "C", "grades": [8], "test_grades": [8], "final_grade": 4},
+    ]
+    
+    def setUp(self):
+        self.factory = RequestFactory()
+    
+    def _post(self, payload):
+        request = self.factory.post("/class/sweep/", json.dumps(payload), content_type="application/json")
+        response = calculate_weight_sweep(request)
+        return response.status_code, json.loads(response.content)
+    
+    def test_deltas_against_current_weights(self):
+        status, data = self._post({"students": self.STUDENTS, "schemes": [{"weights": [30, 30, 40]}]})
+        self.assertEqual(status, 200)
+        self.assertEqual(data["distinct_students"], 2)
+        self.assertEqual(data["baseline"]["grade_counts"], {"2": 0, "3": 2, "4": 0, "5": 1})
+        scheme = data["schemes"][0]
+        self.assertEqual(scheme["grade_counts"], {"2": 0, "3": 2, "4": 1, "5": 0})
+        self.assertEqual(scheme["grade_deltas"], {"2": 0, "3": 0, "4": 1, "5": -1})
+        self.assertEqual((scheme["raised"], scheme["lowered"]), (0, 1))
+    
+    def test_matches_calculator_grades(self):
+        """Every scheme's grades agree with calculate_prediction under those weights"""
+        rng = random.Random(4)
+        students = [
+            {"grades": [rng.randint(0, 10) for _ in range(3)], "assignment_types": ["HW", "Quiz", "HW"],
+             "assignment_type_weights": {"HW": 100, "Quiz": 200},
+             "test_grades": [rng.randint(0, 10)], "final_grade": rng.randint(0, 10)}
+            for _ in range(40)
+        ]
+        schemes = [{"weights": [30, 30, 40]}, {"weights": [20, 20, 60], "assignment_type_weights": {"Quiz": 50}}]
+        status, data = self._post({"students": students, "schemes": schemes, "grid_step": 25})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(data["schemes"]), 2 + 15)
+        for scheme, result in zip(schemes, data["schemes"]):
+            counts = {"2": 0, "3": 0, "4": 0, "5": 0}
+            for student in students:
+                form = {key: ",".join(map(str, value)) if isinstance(value, list) else value for key, value in student.items()}
+                form.update(zip(("weight_assignments", "weight_tests", "weight_final"), scheme["weights"]))
+                form["assignment_type_weights"] = json.dumps(scheme.get("assignment_type_weights", student["assignment_type_weights"]))
+                response = calculate_prediction(self.factory.post("/calculate/", form))
+                counts[str(json.loads(response.content)["current_grade"])] += 1
+            self.assertEqual(result["grade_counts"], counts)
+    
+    def test_weight_grid(self):
+        self.assertEqual(len(weight_grid(10)), 66)
+        self.assertTrue(all(sum(weights) == 100 for weights in weight_grid(5)))
+    
+    def test_rejects_malformed_schemes(self):
+        for schemes in ([], [{"weights": [50, 50]}], [{"weights": [-10, 50, 60]}], [{"weights": [1, 1, 1], "assignment_type_weights": []}]):
+            with self.subTest(schemes=schemes):
+                status, _ = self._post({"students": self.STUDENTS, "schemes": schemes})
+                self.assertEqual(status, 400)
+    
+    def test_rejects_non_finite_schemes(self):
+        """NaN and Infinity (which json.loads accepts) are rejected, not swept or ignored"""
+        for scheme in ({"weights": [float("nan"), 25, 50]}, {"weights": [25, float("inf"), 50]},
+                       {"weights": [25, 25, 50], "assignment_type_weights": {"HW": float("inf")}}):
+            with self.subTest(scheme=scheme):
+                status, _ = self._post({"students": self.STUDENTS, "schemes": [scheme]})
+                self.assertEqual(status, 400)
+
+
+class ServiceWorkerTests(TestCase):
+    def test_precaches_hashed_static_files(self):
+        """The worker is versioned by the static manifest and lists hashed URLs"""
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STATICFILES_STORAGE="django.contrib.staticfiles.storage.ManifestStaticFilesStorage",
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0, ignore_patterns=["admin"])
+            response = service_worker(RequestFactory().get("/sw.js"))
+            body = response.content.decode()
+            self.assertEqual(response["Content-Type"], "application/javascript")
+            self.assertEqual(response["Cache-Control"], "no-cache")
+            self.assertIn(staticfiles_storage.manifest_hash, body)
+            self.assertIn(staticfiles_storage.url("main/images/favicon.svg"), body)
+            self.assertNotIn('"/static/main/images/favicon.svg"', body)
+    
+    def test_unversioned_without_a_manifest(self):
+        """Without collectstatic the worker still renders, with nothing to precache"""
+        body = service_worker(RequestFactory().get("/sw.js")).content.decode()
+        self.assertIn("const CACHE_VERSION = 'dev';", body)
+        self.assertIn("const PRECACHE_URLS = [];", body)
+
+
+class DifferentialTests(TestCase):
+    """Alternative engines must match the frozen reference implementation"""
+    # Raise with DIFFERENTIAL_CASES (or use `manage.py difftest`) for long runs
+    CASES = int(os.getenv("DIFFERENTIAL_CASES", "2000"))
+    
+    def test_engines_match_reference(self):
+        for name, engine in differential.ENGINES.items():
+            with self.subTest(engine=name):
+                self.assertIsNone(differential.run(engine, self.CASES, seed=1))
+    
+    def test_view_matches_reference(self):
+        """The HTTP view agrees with the reference, including error responses"""
+        factory = RequestFactory()
+        
+        def view_engine(data):
+            response = calculate_prediction(factory.post("/calculate/", data))
+            return response.status_code, json.loads(response.content)
+        
+        self.assertIsNone(differential.run(view_engine, 200, seed=2))
+    
+    def test_failures_are_shrunk(self):
+        """A broken engine is reported with a minimal failing input"""
+        def broken_engine(data):
+            status, body = differential.calculator_engine(data)
+            if len([g for g in data.get("test_grades", "").split(",") if g]) >= 2:
+                body["current_percent"] += 1
+            return status, body
+        
+        failure = differential.run(broken_engine, 500, seed=3)
+        self.assertIsNotNone(failure)
+        self.assertEqual(len(failure["input"]["test_grades"].split(",")), 2)
+        self.assertNotIn("grades", failure["input"])
+        self.assertTrue(failure["differences"])
+    
+    def test_differences_respect_tolerance(self):
+        self.assertEqual(differential.differences({"a": [1.0]}, {"a": [1.0 + 1e-9]}), [])
+        self.assertTrue(differential.differences({"a": True}, {"a": 1}))
+        self.assertTrue(differential.differences({"a": 1}, {"b": 1}))
+
+
+class _StubExportHandler(BaseHTTPRequestHandler):
+    """Serves the e-diary export fixture; some paths fail before succeeding"""
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        if failures:
+            status, document = 503, {}
+        elif self.path in server.documents:
+            status, document = 200, server.documents[self.path]
+        else:
+            status, document = 404, {}
+        body = document if isinstance(document, bytes) else json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class EdiaryImporterTests(TestCase):
+    MARKS = {
+        "1": {"subjects": [
+            {"name": "Algebra", "total_tests": 2, "marks": [
+                {"kind": "assignment", "type": "HW", "value": 8, "max": 10, "weight": 100},
+                {"kind": "assignment", "type": "Essay", "value": 40, "max": 50, "weight": 200},
+                {"kind": "test", "value": 17, "max": 20},
+            ]},
+            {"name": "Physics", "marks": [{"kind": "test", "value": 30, "max": 20}]},
+        ]},
+        "2": {"subjects": [
+            {"name": "Algebra", "weights": {"assignments": 30, "tests": 30, "final": 40}, "marks": [
+                {"kind": "assignment", "type": "HW", "value": 5, "max": 10},
+                {"kind": "assignment", "type": "HW", "value": 18, "max": 20},
+                {"kind": "final", "value": 70, "max": 100},
+            ]},
+        ]},
+        "3": {"subjects": []},
+    }
+    
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubExportHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.failures = {"/api/students/2/marks": 2}
+        self.server.documents = {
+            "/api/schools/9/classes": {"classes": [{"id": "7A"}, {"id": "7B"}]},
+            "/api/classes/7A/students": {"students": [{"id": "1"}, {"id": "2"}]},
+            "/api/classes/7B/students": {"students": [{"id": "3"}]},
+            **{f"/api/students/{sid}/marks": marks for sid, marks in self.MARKS.items()},
+        }
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+    
+    def _importer(self, retries=3):
+        client = ExportClient(self.base_url, retries=retries, sleep=lambda delay: None)
+        return EdiaryImporter(client, concurrency=4, batch_size=2)
+    
+    def test_imports_school_with_retries(self):
+        """A whole school is imported; transient 503s are retried"""
+        result = self._importer().import_school("9")
+        self.assertEqual(result.students, 3)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.rejected, [("ediary:1", "Physics", "grade_exceeds_max")])
+        self.assertEqual(self.server.requests.count("/api/students/2/marks"), 3)
+        
+        gradebook = Gradebook.objects.get(student_key="ediary:1", course="Algebra")
+        expected = json.loads(calculate_prediction(RequestFactory().post("/calculate/", {
+            "grades": "8,8",
+            "assignment_types": "HW,Essay",
+            "assignment_type_weights": json.dumps({"HW": 100, "Essay": 200}),
+            "test_grades": "8.5",
+            "total_tests": "2",
+        })).content)
+        # The Essay mark was out of 50 and rescaled on import
+        expected["rescaled_types"] = ["Essay"]
+        self.assertEqual(gradebook.predict(), expected)
+        
+        # A type whose marks have different maximums is normalized per mark
+        mixed = Gradebook.objects.get(student_key="ediary:2", course="Algebra")
+        self.assertEqual(mixed.get_assignment_grades(), [5.0, 9.0])
+        self.assertAlmostEqual(mixed.weight_final, 0.4)
+    
+    def test_reimport_updates_in_place(self):
+        """Importing again updates existing gradebooks instead of duplicating them"""
+        self._importer().import_classes(["7A"])
+        self.server.documents["/api/students/1/marks"] = {"subjects": [
+            {"name": "Algebra", "marks": [{"kind": "assignment", "value": 10}]},
+        ]}
+        result = self._importer().import_classes(["7A"])
+        self.assertEqual((result.created, result.updated), (0, 2))
+        self.assertEqual(Gradebook.objects.count(), 2)
+        gradebook = Gradebook.objects.get(student_key="ediary:1", course="Algebra")
+        self.assertEqual(gradebook.get_assignment_grades(), [10.0])
+    
+    def test_gives_up_after_retries(self):
+        """Persistent failures are recorded per class and the other classes still import"""
+        self.server.failures["/api/classes/7B/students"] = 10
+        result = self._importer(retries=2).import_classes(["7A", "7B"])
+        self.assertEqual(self.server.requests.count("/api/classes/7B/students"), 3)
+        self.assertEqual([(kind, item_id) for kind, item_id, _ in result.failed], [("class", "7B")])
+        self.assertEqual(result.students, 2)
+        with self.assertRaises(EdiaryImportError):
+            ExportClient(self.base_url, retries=0).get_json("/classes/7B/students")
+    
+    def test_malformed_documents_are_recorded(self):
+        """Undecodable bodies and entries without ids fail one item, not the import"""
+        self.server.documents["/api/classes/7A/students"] = {"students": [{"id": "1"}, {"name": "no id"}, {"id": "2"}]}
+        self.server.documents["/api/students/2/marks"] = b"<html>maintenance</html>"
+        self.server.documents["/api/students/3/marks"] = {"subjects": ["Algebra"]}
+        result = self._importer().import_classes(["7A", "7B"])
+        self.assertEqual(sorted((kind, item_id) for kind, item_id, _ in result.failed), [("class", "7A"), ("student", "2")])
+        self.assertIn("invalid JSON", dict((item_id, error) for _, item_id, error in result.failed)["2"])
+        self.assertIn(("ediary:3", "", "invalid_request"), result.rejected)
+        self.assertEqual(result.students, 2)
+        self.assertTrue(Gradebook.objects.filter(student_key="ediary:1", course="Algebra").exists())
+
+
+# Keep the process-wide aggregator from flushing into these assertions
+@override_settings(ANALYTICS_FLUSH_SECONDS=10 ** 9)
+class UsageAnalyticsTests(TestCase):
+    def setUp(self):
+        self.now = 7200.0
+        self.aggregator = UsageAggregator(flush_seconds=60, clock=lambda: self.now, background=False)
+    
+    def _record(self, data):
+        request = RequestFactory().post("/calculate/", data)
+        response = json.loads(calculate_prediction(request).content)
+        self.aggregator.record_prediction(response, (0.25, 0.25, 0.5), "en")
+    
+    def _counts(self, metric):
+        return dict(UsageBucket.objects.filter(metric=metric).values_list("key", "count"))
+    
+    def test_counts_are_flushed_in_bulk_per_interval(self):
+        """Counts stay in memory until the interval passes, then add to stored totals"""
+        self._record({"grades": "8,8", "test_grades": "8,8"})
+        self.assertFalse(UsageBucket.objects.exists())
+        
+        self.now += 60
+        self._record({"grades": "10", "test_grades": "10", "final_grade": "10"})
+        self.assertEqual(self._counts("branch"), {"final_only": 1, "highest": 1})
+        self.assertEqual(self._counts("weights"), {"25/25/50": 2})
+        self.assertEqual(self._counts("needed_score"), {"5-6": 1})
+        
+        self.now += 60
+        self._record({"grades": "8,8", "test_grades": "8,8"})
+        self.assertEqual(self._counts("branch"), {"final_only": 2, "highest": 1})
+        self.assertEqual(UsageBucket.objects.filter(metric="branch").count(), 2)
+    
+    def test_interval_flush_runs_off_the_request_thread(self):
+        """The request crossing the interval hands the flush to a background thread"""
+        aggregator = UsageAggregator(flush_seconds=60, clock=lambda: self.now)
+        release = threading.Event()
+        flushed_on = []
+        
+        def slow_flush():
+            flushed_on.append(threading.current_thread())
+            release.wait(5)
+        
+        with mock.patch.object(aggregator, "flush", slow_flush):
+            self.now += 60
+            aggregator.record_error("invalid_grades", "en")
+            # A second due request while the first flush is still running starts no new thread
+            self.now += 60
+            aggregator.record_error("invalid_grades", "en")
+            release.set()
+            aggregator._flusher.join(5)
+        self.assertEqual(len(flushed_on), 1)
+        self.assertIsNot(flushed_on[0], threading.current_thread())
+    
+    def test_errors_are_counted(self):
+        self.aggregator.record_error("invalid_grades", "ru")
+        self.aggregator.flush()
+        self.assertEqual(self._counts("error"), {"invalid_grades": 1})
+        self.assertEqual(self._counts("language"), {"ru": 1})
+    
+    def test_admin_summary(self):
+        """The admin changelist shows per-metric totals"""
+        self.aggregator.record_error("invalid_grades", "en")
+        self.aggregator.record_error("grade_exceeds_max", "en")
+        self.aggregator.flush()
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin_user)
+        response = self.client.get("/admin/main/usagebucket/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        summary = dict(response.context["usage_summary"])
+        self.assertEqual([row["total"] for row in summary["branch"]], [2])
+        self.assertEqual(summary["error"][0]["share"], 50.0)
+
+
+class AnswerTableTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "answers.bin")
+        answer_table.build(cls.path, max_missing_tests=3)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+    
+    def setUp(self):
+        self.table = answer_table.AnswerTable(self.path)
+    
+    def test_on_grid_inputs_match_live_engine(self):
+        cases = [
+            {"grades": "7,8", "test_grades": "7,8", "total_tests": "2"},
+            {"grades": "6", "test_grades": "8", "total_tests": "3", "language": "ru"},
+            {"grades": "10,10", "test_grades": "10", "final_grade": "10", "language": "kk"},
+            {"grades": "9.5", "test_grades": "9,10", "total_tests": "3"},
+            {"test_grades": "4"},
+            {},
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                parsed = parse_grade_input(data)
+                language = data.get("language", "en")
+                self.assertEqual(self.table.lookup(parsed, language), predict(parsed, language))
+    
+    def test_uncovered_inputs_fall_back(self):
+        cases = [
+            {"grades": "7,8,8", "test_grades": "7"},
+            {"grades": "7", "test_grades": "7", "weight_final": "60"},
+            {"grades": "7", "test_grades": "7", "final_grade": "7"},
+            {"grades": "7", "test_grades": "7", "total_tests": "5"},
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                self.assertIsNone(self.table.lookup(parse_grade_input(data)))
+    
+    def test_stale_table_is_ignored(self):
+        """A table built for other thresholds or weights is not used"""
+        with open(self.path, "rb") as f:
+            content = bytearray(f.read())
+        content[10] ^= 0xFF  # corrupt the fingerprint
+        stale_path = os.path.join(self.directory.name, "stale.bin")
+        with open(stale_path, "wb") as f:
+            f.write(content)
+        with self.assertLogs("main.answer_table", level="WARNING"):
+            self.assertFalse(answer_table.AnswerTable(stale_path).available)
+        self.assertFalse(answer_table.AnswerTable(os.path.join(self.directory.name, "missing.bin")).available)
+    
+    def test_view_records_hit_rate(self):
+        aggregator = UsageAggregator(flush_seconds=10**9)
+        factory = RequestFactory()
+        with mock.patch("main.views.answers", self.table), mock.patch("main.views.usage", aggregator):
+            for grades in ("7,8", "7,8,8"):
+                response = calculate_prediction(factory.post("/calculate/", {"grades": grades, "test_grades": "7"}))
+                self.assertEqual(response.status_code, 200)
+        aggregator.flush()
+        counts = dict(UsageBucket.objects.filter(metric="answer_table").values_list("key", "count"))
+        self.assertEqual(counts, {"hit": 1, "miss": 1})
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(PROFILING_DIR=self.directory.name, PROFILING_MAX_CAPTURES=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def _calculate(self, **headers):
+        return self.client.post("/calculate/", {"grades": "8,9", "test_grades": "7"}, secure=True, **headers)
+    
+    def test_unflagged_requests_are_not_profiled(self):
+        response = self._calculate()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(ProfileCapture.objects.exists())
+    
+    def test_signed_token_profiles_request(self):
+        response = self._calculate(HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(response.status_code, 200)
+        capture = ProfileCapture.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(capture.path, "/calculate/")
+        self.assertGreater(capture.total_calls, 0)
+        path = os.path.join(self.directory.name, capture.filename)
+        self.assertIn("predict", profiling.top_functions(path))
+    
+    def test_requires_valid_token_or_staff(self):
+        self._calculate(HTTP_X_PROFILE="profile:forged:signature")
+        self._calculate(HTTP_X_PROFILE="1")
+        self.client.force_login(User.objects.create_user("student", password="password"))
+        self._calculate(HTTP_X_PROFILE="1")
+        self.assertFalse(ProfileCapture.objects.exists())
+        
+        self.client.force_login(User.objects.create_user("teacher", password="password", is_staff=True))
+        self.assertIn("X-Profile-Id", self._calculate(HTTP_X_PROFILE="1"))
+    
+    def test_retention_cap(self):
+        """Only the newest PROFILING_MAX_CAPTURES captures and files are kept"""
+        ids = [self._calculate(HTTP_X_PROFILE=profiling.make_token())["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual(sorted(ProfileCapture.objects.values_list("pk", flat=True)), sorted(int(i) for i in ids[1:]))
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+    
+    def test_admin_shows_stats(self):
+        capture_id = self._calculate(HTTP_X_PROFILE=profiling.make_token())["X-Profile-Id"]
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        response = self.client.get(f"/admin/main/profilecapture/{capture_id}/change/", secure=True)
+        self.assertContains(response, "cumulative")
+
+
+@override_settings(ALLOWED_HOSTS=["localhost", "127.0.0.1"], ANALYTICS_ENABLED=False)
+class LoadTestTests(LiveServerTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7.0], 95), 7.0)
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+    
+    def test_step_against_live_server(self):
+        """Every endpoint in the mix is exercised without errors"""
+        step = loadtest.run_step(self.live_server_url, clients=2, duration=1.0, health_interval=0.2)
+        self.assertGreater(step["requests"], 0)
+        self.assertEqual(step["errors"], 0)
+        self.assertEqual(set(step["endpoints"]), {"home", "calculate", "health"})
+        self.assertTrue(loadtest.meets_slo(step, {"p95_ms": 10**6, "p99_ms": 10**6, "error_rate": 0}))
+    
+    def test_https_targets_and_unsupported_schemes(self):
+        """https:// URLs speak TLS, with verification unless turned off; other schemes are rejected"""
+        client = loadtest._Client("https://127.0.0.1:8443", 0, verify_tls=False)
+        self.assertEqual(client.tls_context.verify_mode, ssl.CERT_NONE)
+        self.assertEqual(loadtest._Client("https://example.com", 0).tls_context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertIsNone(loadtest._Client(self.live_server_url, 0).tls_context)
+        with self.assertRaises(ValueError):
+            loadtest.run_step("ftp://127.0.0.1", clients=1, duration=0.1)
+    
+    def test_evaluate_flags_regressions(self):
+        slo = loadtest.DEFAULT_SLO
+        
+        def report(p95, rps):
+            step = {"requests": 100, "p95_ms": p95, "p99_ms": p95, "error_rate": 0.0, "rps": rps}
+            return {"configs": [{"name": "workers=2", "steps": [step], "sustainable_rps": rps}]}
+        
+        baseline = report(50, 400)
+        self.assertEqual(loadtest.evaluate(report(55, 380), slo, baseline), [])
+        failures = loadtest.evaluate(report(80, 250), slo, baseline)
+        self.assertEqual(len(failures), 2)
+        self.assertIn("lightest load step", loadtest.evaluate(report(900, 50), slo)[0])
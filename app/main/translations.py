@@ -59,11 +59,26 @@ TRANSLATIONS = {
         'kk': 'Барлық бағалар 0 және 10 арасында болуы керек',
         'ru': 'Все оценки должны быть между 0 и 10'
     },
+    'grade_exceeds_max': {
+        'en': 'A grade cannot be higher than its maximum',
+        'kk': 'Баға өзінің ең жоғары мәнінен аспауы керек',
+        'ru': 'Оценка не может быть больше максимальной'
+    },
     'invalid_request': {
         'en': 'Invalid request',
         'kk': 'Жарамсыз сұрау',
         'ru': 'Неверный запрос'
     },
+    'not_authorized': {
+        'en': 'Sign in with a teacher account to use saved gradebooks',
+        'kk': 'Сақталған журналдарды пайдалану үшін мұғалім тіркелгісімен кіріңіз',
+        'ru': 'Войдите с учётной записью учителя, чтобы пользоваться сохранёнными журналами'
+    },
+    'gradebook_not_found': {
+        'en': 'No saved gradebook found for this student and course',
+        'kk': 'Бұл оқушы мен пән үшін сақталған журнал табылмады',
+        'ru': 'Сохранённый журнал для этого ученика и предмета не найден'
+    },
     'error': {
         'en': 'Error',
         'kk': 'Қате',
@@ -2,10 +2,20 @@ from django.urls import path
 from main import views
 from django.views.generic.base import RedirectView
 from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.functional import lazy
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('calculate/', views.calculate_prediction, name='calculate_prediction'),
+    path('semester/', views.calculate_semester, name='calculate_semester'),
+    path('class/', views.class_dashboard, name='class_dashboard'),
+    path('class/stats/', views.calculate_class, name='calculate_class'),
+    path('class/sweep/', views.calculate_weight_sweep, name='calculate_weight_sweep'),
+    path('gradebook/', views.load_gradebook, name='load_gradebook'),
+    path('gradebook/save/', views.save_gradebook, name='save_gradebook'),
+    path('gradebook/grade/', views.update_gradebook_grade, name='update_gradebook_grade'),
     path('health/', views.health_check, name='health_check'),
-    path('ads.txt', RedirectView.as_view(url=staticfiles_storage.url('main/ads.txt'))),
+    path('sw.js', views.service_worker, name='service_worker'),
+    # Resolved per request: the manifest does not exist until collectstatic has run
+    path('ads.txt', RedirectView.as_view(url=lazy(staticfiles_storage.url, str)('main/ads.txt'))),
 ]
\ No newline at end of file
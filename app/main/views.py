@@ -1,56 +1,77 @@
 
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.http import JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
-from django.db import connection
+from django.db import connection, transaction
 import logging
 import json
+import math
+from functools import wraps
+from .grading import (
+    DEFAULT_MAX_ASSIGNMENT,
+    SUPPORTED_LANGUAGES,
+    MAX_SEMESTER_COURSES,
+    MAX_CLASS_STUDENTS,
+    MAX_SWEEP_SCHEMES,
+    MAX_SWEEP_CELLS,
+    GradeInputError,
+    class_overview,
+    parse_grade_input,
+    predict,
+    semester_overview,
+    summarize_assignments,
+    weight_grid,
+    weight_sweep,
+)
+from .analytics import usage
+from .answer_table import answers
+from .models import Gradebook
 from .translations import get_translation
 
 logger = logging.getLogger(__name__)
 
-# Grade thresholds (numeric grade: minimum percentage required)
-GRADES_PERCENT = {
-    5: 0.85,
-    4: 0.65,
-    3: 0.40,
-    2: 0.00,
-}
-
-# Letter grade mapping for English language
-LETTER_GRADES = {
-    5: 'A',
-    4: 'B',
-    3: 'C',
-    2: 'F'
-}
-
-LETTER_GRADE_RANGES = {
-    5: 'A (85-100%)',
-    4: 'B (65-84%)',
-    3: 'C (40-64%)',
-    2: 'F (0-39%)'
-}
-
-# Default weights (used as fallback)
-DEFAULT_WEIGHT_ASSIGNMENTS = 0.25
-DEFAULT_WEIGHT_TESTS = 0.25
-DEFAULT_WEIGHT_FINAL = 0.5
-
-# Default maximum values for different assessment types
-DEFAULT_MAX_ASSIGNMENT = 10.0
-DEFAULT_MAX_TEST = 10.0
-DEFAULT_MAX_FINAL = 10.0
-
 def home(request):
     return render(request, "main/home.html")
 
+
+@require_http_methods(["GET"])
+def service_worker(request):
+    """
+    Serves the service worker from the site root so it controls every page.
+    
+    The cache version is the collectstatic manifest hash, so each deployment
+    with changed static files installs a fresh worker and drops old caches.
+    """
+    hashed_files = getattr(staticfiles_storage, "hashed_files", {})
+    precache_urls = [
+        staticfiles_storage.url(name)
+        for name in sorted(hashed_files)
+        if name.startswith("main/") and not name.endswith(".txt")
+    ]
+    context = {
+        "cache_version": getattr(staticfiles_storage, "manifest_hash", "") or "dev",
+        "static_url": settings.STATIC_URL,
+        "shell_url": reverse("home"),
+        "precache_urls": json.dumps(precache_urls),
+    }
+    response = render(request, "main/sw.js", context, content_type="application/javascript")
+    # Browsers must revalidate the worker itself to notice new deployments
+    response["Cache-Control"] = "no-cache"
+    return response
+
 def calculate_prediction(request):
     """
     Predicts what grade a student needs on missing assessments to reach the next grade level.
     
     POST Parameters:
     - grades: comma-separated assignment grades (e.g., "8,9,7")
+    - assignment_types: comma-separated type of each assignment grade
+    - assignment_type_weights: JSON object of type -> weight percentage
+    - assignment_type_maxes: JSON object of type -> maximum grade; raw grades are
+      rescaled to 0-10 and the rescaled types are listed in "rescaled_types"
     - test_grades: comma-separated test grades (e.g., "9,8")
     - final_grade: final exam grade (single value)
     - total_tests: total number of tests expected (optional, defaults to completed tests)
@@ -64,345 +85,365 @@ def calculate_prediction(request):
     
     # Get language preference
     language = request.POST.get("language", "en")
-    if language not in ['en', 'kk', 'ru']:
+    if language not in SUPPORTED_LANGUAGES:
         language = 'en'
     
-    # Parse input data
-    assign_grades_str = request.POST.get("grades", "")
-    assign_types_str = request.POST.get("assignment_types", "")
-    assign_type_weights_str = request.POST.get("assignment_type_weights", "")
-    test_grades_str = request.POST.get("test_grades", "")
-    test_maxes_str = request.POST.get("test_maxes", "")
-    final_grade_str = request.POST.get("final_grade", "")
-    final_max_str = request.POST.get("final_max", "")
-    total_tests_str = request.POST.get("total_tests", "")
+    try:
+        parsed = parse_grade_input(request.POST)
+    except GradeInputError as e:
+        usage.record_error(e.key, language)
+        return JsonResponse({"message": get_translation(e.key, language)}, status=400)
     
-    # Get custom weights (with defaults) - now in percentages (0-100)
-    weight_assignments_percent = float(request.POST.get("weight_assignments", DEFAULT_WEIGHT_ASSIGNMENTS * 100))
-    weight_tests_percent = float(request.POST.get("weight_tests", DEFAULT_WEIGHT_TESTS * 100))
-    weight_final_percent = float(request.POST.get("weight_final", DEFAULT_WEIGHT_FINAL * 100))
+    # Summarized once and shared by the table lookup and the live engine
+    assignments = summarize_assignments(
+        parsed["assign_grades"], parsed["assign_types"], parsed["assignment_type_weights"]
+    )
+    response_data = answers.lookup(parsed, language, assignments)
+    table_outcome = None
+    if answers.available:
+        table_outcome = "miss" if response_data is None else "hit"
+    if response_data is None:
+        response_data = predict(parsed, language, assignments)
+    usage.record_prediction(response_data, parsed["weights"], language, answer_table=table_outcome)
+    return JsonResponse(response_data)
+
+
+def _language(data):
+    language = data.get("language", "en")
+    return language if language in SUPPORTED_LANGUAGES else 'en'
+
+
+def _gradebook_key(data):
+    """Return (student_key, course) from request data, or None if missing/too long."""
+    student_key = data.get("student", "").strip()
+    course = data.get("course", "").strip()
+    if not student_key or not course or len(student_key) > 64 or len(course) > 100:
+        return None
+    return student_key, course
+
+
+def _staff_required(view):
+    """Gradebooks hold real student grades, so only active staff sessions may read or change them."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        user = getattr(request, "user", None)
+        if user is None or not (user.is_active and user.is_staff):
+            language = _language(request.POST if request.method == "POST" else request.GET)
+            return JsonResponse({"message": get_translation('not_authorized', language)}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+@require_http_methods(["POST"])
+@_staff_required
+def save_gradebook(request):
+    """
+    Saves (or replaces) a student's gradebook for one course and returns predictions.
     
-    # Convert from percentages to decimals (0-1 range)
-    weight_assignments = weight_assignments_percent / 100.0
-    weight_tests = weight_tests_percent / 100.0
-    weight_final = weight_final_percent / 100.0
+    POST Parameters: the calculate_prediction parameters plus
+    - student: student key (e-diary imports use "ediary:<id>")
+    - course: course name
+    """
+    language = _language(request.POST)
+    key = _gradebook_key(request.POST)
+    if key is None:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
     
-    # Normalize weights to sum to 1.0 (in case they don't sum to 100%)
-    weight_total = weight_assignments + weight_tests + weight_final
-    if weight_total > 0:
-        weight_assignments = weight_assignments / weight_total
-        weight_tests = weight_tests / weight_total
-        weight_final = weight_final / weight_total
-    else:
-        # Fallback to defaults if all weights are 0
-        weight_assignments = DEFAULT_WEIGHT_ASSIGNMENTS
-        weight_tests = DEFAULT_WEIGHT_TESTS
-        weight_final = DEFAULT_WEIGHT_FINAL
+    try:
+        parsed = parse_grade_input(request.POST)
+    except GradeInputError as e:
+        return JsonResponse({"message": get_translation(e.key, language)}, status=400)
+    except (TypeError, ValueError):
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
     
-    # Convert to lists/values
-    assign_grades = [float(g) for g in assign_grades_str.split(",") if g.strip()]
-    assign_types = [t.strip() for t in assign_types_str.split(",") if t.strip()] if assign_types_str else []
+    # get_or_create retries the read if a concurrent first save inserts the row
+    # first, and the row lock serializes saves to an existing gradebook
+    with transaction.atomic():
+        gradebook, _ = Gradebook.objects.select_for_update().get_or_create(student_key=key[0], course=key[1])
+        gradebook.set_grades(parsed)
+        gradebook.save()
     
-    # Parse assignment type weights
-    assignment_type_weights = {}
-    if assign_type_weights_str:
-        try:
-            assignment_type_weights = json.loads(assign_type_weights_str)
-        except json.JSONDecodeError:
-            assignment_type_weights = {}
+    response_data = gradebook.predict(language)
+    response_data["gradebook_id"] = gradebook.pk
+    return JsonResponse(response_data)
+
+
+@require_http_methods(["GET"])
+@_staff_required
+def load_gradebook(request):
+    """
+    Loads a saved gradebook with its predictions in a single indexed read.
     
-    test_grades_raw = [float(g) for g in test_grades_str.split(",") if g.strip()]
-    test_maxes = [float(m) for m in test_maxes_str.split(",") if m.strip()]
-    final_grade_raw = float(final_grade_str) if final_grade_str.strip() else None
-    final_max = float(final_max_str) if final_max_str.strip() else None
-    total_tests = int(total_tests_str) if total_tests_str.strip() else len(test_grades_raw)
+    GET Parameters: student, course, language
+    """
+    language = _language(request.GET)
+    key = _gradebook_key(request.GET)
+    if key is None:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
     
-    # Normalize test grades to 0-10 scale
-    test_grades = []
-    if len(test_grades_raw) > 0:
-        if len(test_grades_raw) == len(test_maxes) and len(test_maxes) > 0:
-            # Both grades and maxes provided - normalize to 0-10 scale
-            for grade, max_val in zip(test_grades_raw, test_maxes):
-                if max_val > 0:
-                    if grade > max_val:
-                        return JsonResponse({"message": get_translation('grade_exceeds_max', language)}, status=400)
-                    normalized = (grade / max_val) * 10
-                    test_grades.append(normalized)
-                else:
-                    return JsonResponse({"message": get_translation('invalid_grades', language)}, status=400)
-        else:
-            # If maxes not provided or don't match, assume grades are already on 0-10 scale
-            test_grades = [min(grade, 10.0) for grade in test_grades_raw]
+    gradebook = Gradebook.objects.filter(student_key=key[0], course=key[1]).first()
+    if gradebook is None:
+        return JsonResponse({"message": get_translation('gradebook_not_found', language)}, status=404)
     
-    # Normalize final grade to 0-10 scale
-    final_grade = None
-    if final_grade_raw is not None:
-        if final_max is not None and final_max > 0:
-            if final_grade_raw > final_max:
-                return JsonResponse({"message": get_translation('grade_exceeds_max', language)}, status=400)
-            final_grade = (final_grade_raw / final_max) * 10
-        else:
-            # If max not provided, assume grade is already on 0-10 scale
-            final_grade = min(final_grade_raw, 10.0)
+    response_data = gradebook.predict(language)
+    response_data.update({
+        "gradebook_id": gradebook.pk,
+        "grades": gradebook.get_assignment_grades(),
+        "assignment_types": gradebook.get_assignment_types(),
+        "assignment_type_weights": gradebook.assignment_type_weights,
+        "test_grades": gradebook.get_test_grades(),
+        "final_grade": gradebook.final_grade,
+        "total_tests": gradebook.total_tests,
+    })
+    return JsonResponse(response_data)
+
+
+@require_http_methods(["POST"])
+@_staff_required
+def update_gradebook_grade(request):
+    """
+    Changes a single grade in a saved gradebook, updating cached aggregates incrementally.
     
-    # Validate input ranges (all should be 0-10 after normalization)
-    for grade in assign_grades:
-        if grade < 0:
-            return JsonResponse({"message": get_translation('invalid_grades', language)}, status=400)
+    POST Parameters:
+    - student, course: gradebook key
+    - component: "assignment", "test" or "final"
+    - index: position of the grade to change (omit to append an assignment or test)
+    - grade: new grade, with optional max to normalize to the 0-10 scale
+    - assignment_type: type of an appended assignment
+    """
+    language = _language(request.POST)
+    key = _gradebook_key(request.POST)
+    component = request.POST.get("component", "")
+    if key is None or component not in ("assignment", "test", "final"):
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
     
-    for grade in test_grades:
-        if grade < 0:
+    try:
+        grade = float(request.POST.get("grade", ""))
+        max_str = request.POST.get("max", "")
+        max_val = float(max_str) if max_str.strip() else None
+        index_str = request.POST.get("index", "")
+        index = int(index_str) if index_str.strip() else None
+    except ValueError:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+    if not math.isfinite(grade) or (max_val is not None and not math.isfinite(max_val)):
+        return JsonResponse({"message": get_translation('invalid_grades', language)}, status=400)
+    if max_val is not None:
+        if max_val <= 0:
             return JsonResponse({"message": get_translation('invalid_grades', language)}, status=400)
-    
-    if final_grade is not None and final_grade < 0:
+        if grade > max_val:
+            return JsonResponse({"message": get_translation('grade_exceeds_max', language)}, status=400)
+        grade = (grade / max_val) * 10
+    elif component != "assignment":
+        grade = min(grade, 10.0)
+    elif grade > DEFAULT_MAX_ASSIGNMENT:
+        return JsonResponse({"message": get_translation('invalid_grades', language)}, status=400)
+    if grade < 0:
         return JsonResponse({"message": get_translation('invalid_grades', language)}, status=400)
     
-    # Calculate completed tests count
-    completed_tests = len(test_grades)
-    missing_tests = max(0, total_tests - completed_tests)
-    has_final = final_grade is not None
+    # Lock the row so concurrent single-grade updates apply one after another
+    with transaction.atomic():
+        gradebook = Gradebook.objects.select_for_update().filter(student_key=key[0], course=key[1]).first()
+        if gradebook is None:
+            return JsonResponse({"message": get_translation('gradebook_not_found', language)}, status=404)
+        
+        count = gradebook.assign_count if component == "assignment" else gradebook.test_count
+        if index is not None and not 0 <= index < count:
+            return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+        
+        if component == "final":
+            gradebook.set_final_grade(grade)
+        elif component == "test":
+            gradebook.update_test_grade(count if index is None else index, grade)
+        elif index is None:
+            gradebook.add_assignment_grade(grade, request.POST.get("assignment_type", "").strip() or 'Default')
+        else:
+            gradebook.update_assignment_grade(index, grade)
+        gradebook.save(update_fields=Gradebook.GRADE_FIELDS + ("updated_at",))
     
-    # Calculate current weighted score
-    current_score = 0.0
-    weight_used = 0.0
+    response_data = gradebook.predict(language)
+    response_data["gradebook_id"] = gradebook.pk
+    return JsonResponse(response_data)
+
+
+@require_http_methods(["POST"])
+def calculate_semester(request):
+    """
+    Predicts a whole semester in one request: per-course breakdown, GPA and focus ranking.
     
-    # Add assignments contribution (with type-based weighting if applicable)
-    if assign_grades:
-        if assign_types and len(assign_types) == len(assign_grades) and assignment_type_weights:
-            # Calculate weighted average based on assignment types
-            total_weighted_sum = 0.0
-            total_type_weight = 0.0
-            
-            for grade, assign_type in zip(assign_grades, assign_types):
-                # Assignment type weights are in percentages, convert to relative weights
-                type_weight_percent = assignment_type_weights.get(assign_type, 100.0)
-                type_weight = type_weight_percent / 100.0  # Convert to 0-1 range
-                total_weighted_sum += grade * type_weight
-                total_type_weight += type_weight
-            
-            if total_type_weight > 0:
-                assign_avg = total_weighted_sum / total_type_weight
-            else:
-                assign_avg = sum(assign_grades) / len(assign_grades)
-        else:
-            # Simple average if no types specified
-            assign_avg = sum(assign_grades) / len(assign_grades)
-        
-        current_score += assign_avg * weight_assignments
-        weight_used += weight_assignments
+    JSON body:
+    - courses: list of objects with "name", optional "credits" (default 1) and
+      the calculate_prediction fields (grade lists may be arrays or comma-separated)
+    - language: language code (en, kk, ru) for localized messages
     
-    # Add tests contribution
-    if test_grades:
-        test_avg = sum(test_grades) / len(test_grades)
-        current_score += test_avg * weight_tests
-        weight_used += weight_tests
+    Returns JSON with "gpa", per-course "courses" and a "focus" list ordered by
+    GPA gain per percentage point still needed.
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({"message": get_translation('invalid_request', 'en')}, status=400)
     
-    # Add final exam contribution
-    if has_final:
-        current_score += final_grade * weight_final
-        weight_used += weight_final
+    language = _language(payload)
+    course_data = payload.get("courses")
+    if not isinstance(course_data, list) or not 0 < len(course_data) <= MAX_SEMESTER_COURSES:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
     
-    # Current percentage (out of total possible)
-    if weight_used > 0:
-        current_percent = current_score / 10
-    else:
-        current_percent = 0.0
+    courses = []
+    for index, data in enumerate(course_data):
+        if not isinstance(data, dict):
+            return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+        name = str(data.get("name") or index + 1)
+        try:
+            credits = float(data.get("credits", 1))
+            parsed = parse_grade_input(data)
+        except GradeInputError as e:
+            return JsonResponse({"message": get_translation(e.key, language), "course": name}, status=400)
+        except (TypeError, ValueError):
+            return JsonResponse({"message": get_translation('invalid_request', language), "course": name}, status=400)
+        if not math.isfinite(credits) or credits <= 0:
+            return JsonResponse({"message": get_translation('invalid_request', language), "course": name}, status=400)
+        courses.append({"name": name, "credits": credits, "parsed": parsed})
     
-    # Determine current and next grade
-    current_grade = 2  # Default lowest grade
-    for grade in sorted(GRADES_PERCENT.keys()):
-        if current_percent >= GRADES_PERCENT[grade]:
-            current_grade = grade
+    try:
+        return JsonResponse(semester_overview(courses, language))
+    except GradeInputError as e:
+        return JsonResponse({"message": get_translation(e.key, language), "course": e.course}, status=400)
+
+
+def _parse_roster(student_data, language):
+    """Parse roster entries; returns (students, rejected) with a message per rejected entry."""
+    students = []
+    rejected = []
+    for index, data in enumerate(student_data):
+        if not isinstance(data, dict):
+            rejected.append({"name": str(index + 1), "message": get_translation('invalid_request', language)})
+            continue
+        name = str(data.get("name") or index + 1)
+        try:
+            students.append({"name": name, "parsed": parse_grade_input(data)})
+        except GradeInputError as e:
+            rejected.append({"name": name, "message": get_translation(e.key, language)})
+        except (TypeError, ValueError):
+            rejected.append({"name": name, "message": get_translation('invalid_request', language)})
+    return students, rejected
+
+
+def _parse_scheme(data):
+    """Validate one weight scheme from a sweep request; returns None if malformed."""
+    if not isinstance(data, dict):
+        return None
+    weights = data.get("weights")
+    if not isinstance(weights, list) or len(weights) != 3:
+        return None
+    try:
+        weights = [float(w) for w in weights]
+    except (TypeError, ValueError):
+        return None
+    # json.loads accepts NaN and Infinity, which would leak into the response
+    if any(not math.isfinite(w) or w < 0 for w in weights):
+        return None
+    scheme = {"weights": weights}
+    type_weights = data.get("assignment_type_weights")
+    if type_weights is not None:
+        if not isinstance(type_weights, dict):
+            return None
+        try:
+            scheme["assignment_type_weights"] = {str(k): float(v) for k, v in type_weights.items()}
+        except (TypeError, ValueError):
+            return None
+        if not all(math.isfinite(v) for v in scheme["assignment_type_weights"].values()):
+            return None
+    return scheme
+
+
+@require_http_methods(["GET"])
+def class_dashboard(request):
+    return render(request, "main/class.html")
+
+
+@require_http_methods(["POST"])
+def calculate_class(request):
+    """
+    Predicts a whole class roster in one request for the teacher dashboard.
     
-    # Find next grade target
-    next_grade = None
-    for grade in sorted(GRADES_PERCENT.keys()):
-        if grade > current_grade:
-            next_grade = grade
-            break
+    JSON body:
+    - students: list of objects with an optional "name" and the
+      calculate_prediction fields (grade lists may be arrays or comma-separated)
+    - language: language code (en, kk, ru) for localized messages
     
-    # If already at highest grade
-    if next_grade is None:
-        response_data = {
-            "message": get_translation('already_highest', language),
-            "current_grade": current_grade,
-            "current_percent": round(current_percent * 100, 2)
-        }
-        # Add letter grade for English
-        if language == 'en':
-            response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
-        return JsonResponse(response_data)
+    Returns JSON with class aggregates (grade counts, percentage histogram and
+    percentiles, reachable counts and median needed score per target grade),
+    per-student "students" rows, and "rejected" rows whose grades failed validation
+    or could not be predicted.
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({"message": get_translation('invalid_request', 'en')}, status=400)
     
-    # Build predictions for all reachable grades
-    predictions = []
+    language = _language(payload)
+    student_data = payload.get("students")
+    if not isinstance(student_data, list) or not 0 < len(student_data) <= MAX_CLASS_STUDENTS:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
     
-    # Case 1: Missing tests or final exam
-    if missing_tests > 0 or not has_final:
-        # Calculate for each grade higher than current
-        for target_grade in sorted([g for g in GRADES_PERCENT.keys() if g > current_grade]):
-            target_threshold = GRADES_PERCENT[target_grade]
-            
-            missing_weight = 0.0
-            missing_parts = []
-            
-            if missing_tests > 0:
-                missing_weight += weight_tests
-                missing_parts.append(f"{missing_tests} test(s)")
-            
-            if not has_final:
-                missing_weight += weight_final
-                missing_parts.append("final exam")
-            
-            # Calculate required score on missing assessments
-            needed_score = (target_threshold * 10 - current_score) / missing_weight
-            needed_percent = (needed_score / 10) * 100
-            
-            # If only final exam is missing, calculate specifically for final
-            needed_final_percent = None
-            if not has_final and missing_tests == 0:
-                # Only final is missing: (current_score + needed_final * weight_final) / 10 = target_threshold
-                # needed_final = (target_threshold * 10 - current_score) / weight_final
-                if weight_final > 0:
-                    needed_final_score = (target_threshold * 10 - current_score) / weight_final
-                    needed_final_percent = (needed_final_score / 10) * 100
-                    if needed_final_score < 0:
-                        needed_final_score = 0
-                        needed_final_percent = 0
-                else:
-                    needed_final_score = 0
-                    needed_final_percent = 0
-            
-            if needed_score < 0:
-                needed_score = 0
-                needed_percent = 0
-            
-            pred = {
-                "target_grade": target_grade,
-                "needed_score": round(needed_score, 2),
-                "needed_percent": round(needed_percent, 2),
-                "reachable": needed_score <= 10,
-                "missing_parts": missing_parts
-            }
-            
-            # Add final-specific calculation if applicable
-            if needed_final_percent is not None:
-                pred["needed_final_percent"] = round(needed_final_percent, 2)
-                pred["needed_final_score"] = round(needed_final_score, 2)
-            
-            predictions.append(pred)
-        
-        response_data = {
-            "message": get_translation('grade_predictions_remaining', language),
-            "current_grade": current_grade,
-            "current_percent": round(current_percent * 100, 2),
-            "predictions": predictions,
-            "language": language
-        }
-        # Add letter grades for English
-        if language == 'en':
-            response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
-            for pred in predictions:
-                pred["target_grade_letter"] = LETTER_GRADES.get(pred["target_grade"], str(pred["target_grade"]))
-        return JsonResponse(response_data)
+    students, rejected = _parse_roster(student_data, language)
+    response_data = class_overview(students, language)
+    response_data["rejected"] = rejected + response_data["rejected"]
+    return JsonResponse(response_data)
+
+
+@require_http_methods(["POST"])
+def calculate_weight_sweep(request):
+    """
+    Compares a class's grade distribution under many candidate weighting schemes.
     
-    # Case 2: All assessments completed - calculate additional perfect assignments needed
-    else:
-        predictions = []
-        
-        # Calculate for each grade higher than current
-        for target_grade in sorted([g for g in GRADES_PERCENT.keys() if g > current_grade]):
-            target_threshold = GRADES_PERCENT[target_grade]
-            target_avg = target_threshold * 10
-            
-            if current_score >= target_avg:
-                predictions.append({
-                    "target_grade": target_grade,
-                    "needed_tens": 0,
-                    "reachable": True,
-                    "message": "Already reached"
-                })
-                continue
-            
-            # Calculate contribution from tests and final (these don't change)
-            fixed_contribution = 0.0
-            if test_grades:
-                test_avg = sum(test_grades) / len(test_grades)
-                fixed_contribution += test_avg * weight_tests
-            if final_grade is not None:
-                fixed_contribution += final_grade * weight_final
-            
-            # Current assignments (with type-based weighting if applicable)
-            if assign_grades:
-                if assign_types and len(assign_types) == len(assign_grades) and assignment_type_weights:
-                    # Calculate current weighted sum and total weight
-                    current_assign_weighted_sum = 0.0
-                    current_assign_total_weight = 0.0
-                    
-                    for grade, assign_type in zip(assign_grades, assign_types):
-                        # Assignment type weights are in percentages, convert to relative weights
-                        type_weight_percent = assignment_type_weights.get(assign_type, 100.0)
-                        type_weight = type_weight_percent / 100.0  # Convert to 0-1 range
-                        current_assign_weighted_sum += grade * type_weight
-                        current_assign_total_weight += type_weight
-                    
-                    # Try adding perfect assignments (with default type weight) until we reach target
-                    n = 0
-                    default_type_weight_percent = assignment_type_weights.get(assign_types[0] if assign_types else 'Default', 100.0)
-                    default_type_weight = default_type_weight_percent / 100.0  # Convert to 0-1 range
-                    
-                    while n <= 20:
-                        new_weighted_sum = current_assign_weighted_sum + 10 * default_type_weight * n
-                        new_total_weight = current_assign_total_weight + default_type_weight * n
-                        new_assign_avg = new_weighted_sum / new_total_weight if new_total_weight > 0 else 10
-                        new_weighted_score = new_assign_avg * weight_assignments + fixed_contribution
-                        
-                        if new_weighted_score >= target_threshold * 10:
-                            break
-                        n += 1
-                else:
-                    # Simple average calculation
-                    current_assign_sum = sum(assign_grades)
-                    current_assign_count = len(assign_grades)
-                    
-                    # Try adding perfect assignments until we reach target
-                    n = 0
-                    while n <= 20:
-                        new_assign_avg = (current_assign_sum + 10 * n) / (current_assign_count + n) if (current_assign_count + n) > 0 else 10
-                        new_weighted_score = new_assign_avg * weight_assignments + fixed_contribution
-                        
-                        if new_weighted_score >= target_threshold * 10:
-                            break
-                        n += 1
-            else:
-                # No assignments yet
-                n = 0
-                while n <= 20:
-                    new_assign_avg = 10.0  # Perfect assignment
-                    new_weighted_score = new_assign_avg * weight_assignments + fixed_contribution
-                    
-                    if new_weighted_score >= target_threshold * 10:
-                        break
-                    n += 1
-            
-            predictions.append({
-                "target_grade": target_grade,
-                "needed_tens": n if n <= 20 else None,
-                "reachable": n <= 20
-            })
-        
-        response_data = {
-            "message": get_translation('grade_predictions_assignments', language),
-            "current_grade": current_grade,
-            "current_percent": round(current_percent * 100, 2),
-            "predictions": predictions,
-            "language": language
-        }
-        # Add letter grades for English
-        if language == 'en':
-            response_data["current_grade_letter"] = LETTER_GRADES.get(current_grade, str(current_grade))
-            for pred in predictions:
-                pred["target_grade_letter"] = LETTER_GRADES.get(pred["target_grade"], str(pred["target_grade"]))
-        return JsonResponse(response_data)
+    JSON body:
+    - students: roster in the same format as calculate_class; each student's
+      own weights (default 25/25/50) form the baseline
+    - schemes: list of objects with "weights" ([assignments, tests, final]
+      percentages) and optional "assignment_type_weights" replacing the
+      students' own type weights
+    - grid_step: optional integer; adds every weight triple summing to 100 in
+      steps of this size
+    - language: language code (en, kk, ru) for localized messages
+    
+    Returns JSON with the baseline grade counts and, per scheme, grade counts,
+    deltas against the baseline and how many students are raised or lowered.
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({"message": get_translation('invalid_request', 'en')}, status=400)
+    
+    language = _language(payload)
+    student_data = payload.get("students")
+    if not isinstance(student_data, list) or not 0 < len(student_data) <= MAX_CLASS_STUDENTS:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+    
+    scheme_data = payload.get("schemes", [])
+    if not isinstance(scheme_data, list):
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+    schemes = [_parse_scheme(data) for data in scheme_data]
+    if None in schemes:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+    grid_step = payload.get("grid_step")
+    if grid_step is not None:
+        if not isinstance(grid_step, int) or not 1 <= grid_step <= 100:
+            return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+        schemes.extend({"weights": list(weights)} for weights in weight_grid(grid_step))
+    if not 0 < len(schemes) <= MAX_SWEEP_SCHEMES or len(schemes) * len(student_data) > MAX_SWEEP_CELLS:
+        return JsonResponse({"message": get_translation('invalid_request', language)}, status=400)
+    
+    students, rejected = _parse_roster(student_data, language)
+    response_data = weight_sweep([student["parsed"] for student in students], schemes)
+    response_data["rejected"] = rejected
+    return JsonResponse(response_data)
 
 
 @require_http_methods(["GET"])